@@ -0,0 +1,122 @@
+"""
+Times the four reports against synthetic organizations, without network access.
+
+    $ python -m benchmarks.run_benchmarks --scenarios 10x10000,100x10000,1000x10000 --latency 0.01
+
+Each scenario is written repositories x pull requests. For every report the API calls per endpoint,
+the wall time and the peak traced memory are printed, and written as JSON with --output.
+--selection chooses how the repositories are selected: regex lists the organization through REPOSITORY_REGEX,
+names fetches every repository by name through REPOSITORIES. --smoke runs every report with both selections
+against a small organization, to check that the suite still runs.
+With GITHUB_BACKEND=async the stand-in is served on a local port, as aiohttp does not use the replay transport.
+With GITHUB_BACKEND=graphql the reminder goes through the stand-in's GraphQL endpoint.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from dataclasses import replace
+
+os.environ.setdefault('GITHUB_API_TOKEN', 'benchmark')
+os.environ.setdefault('SLACK_API_TOKEN', 'benchmark')
+os.environ.setdefault('ORGANIZATION', 'benchmark')
+
+import controllers.config as config
+import controllers.replay as replay
+import controllers.rate_limit as rate_limit
+import controllers.github_controller as github
+import controllers.slack_post_controller as slack
+from functions import slack_statistic_messaging
+from benchmarks.synthetic import SyntheticGitHub, serve
+
+SMOKE_SCENARIO = '2x50'
+SELECTIONS = ('regex', 'names')
+
+REPORTS = {
+    'reminder': slack_statistic_messaging.pull_request_reminder,
+    'committers': slack_statistic_messaging.top_bottom_contributions,
+    'pr_authors': slack_statistic_messaging.top_bottom_pr_authors,
+    'reviewers': slack_statistic_messaging.top_bottom_reviewers
+}
+
+
+def run_report(report, adapter, selection):
+    if selection == 'regex':
+        config.current = replace(config.get(), repositories=(), repository_regex='.*')
+    else:
+        config.current = replace(config.get(), repositories=tuple(adapter.names), repository_regex=None)
+    replay.transport = adapter
+    rate_limit.gate = rate_limit.RateLimitGate()
+    github.client = None
+    github.run_cache.clear()
+    replay.install(slack.get_session())
+    if config.get().github_backend == 'graphql':
+        import controllers.github_graphql_controller as graphql
+        replay.install(graphql.get_session())
+
+    server = None
+    if config.get().github_backend == 'async':
+        server, url = serve(adapter)
+        config.current = replace(config.get(), github_api_url=url)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        report()
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    wall_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'api_calls': sum(adapter.calls.values()),
+        'endpoints': dict(adapter.calls),
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_memory_mb': round(peak / 1024 / 1024, 2),
+        'throttled_seconds': rate_limit.gate.counters()['throttled_seconds']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default='10x10000,100x10000,1000x10000')
+    parser.add_argument('--reports', default=','.join(REPORTS))
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every answer')
+    parser.add_argument('--rate-limit', type=int, default=0, help='rate limit budget announced in the headers')
+    parser.add_argument('--pending-statistics', type=int, default=0,
+                        help='202 answers before contributor statistics are served')
+    parser.add_argument('--selection', choices=SELECTIONS, default='regex')
+    parser.add_argument('--output', help='JSON file receiving the results')
+    parser.add_argument('--smoke', action='store_true',
+                        help='runs the {0} scenario only, with every selection'.format(SMOKE_SCENARIO))
+    arguments = parser.parse_args()
+    scenarios = SMOKE_SCENARIO if arguments.smoke else arguments.scenarios
+    selections = SELECTIONS if arguments.smoke else (arguments.selection,)
+
+    results = []
+    for scenario in scenarios.split(','):
+        repositories, pulls = (int(value) for value in scenario.split('x'))
+        for selection in selections:
+            for name in arguments.reports.split(','):
+                adapter = SyntheticGitHub(os.environ['ORGANIZATION'], repositories, pulls, latency=arguments.latency,
+                                          rate_limit=arguments.rate_limit,
+                                          pending_statistics=arguments.pending_statistics)
+                result = dict(run_report(REPORTS[name], adapter, selection), report=name, selection=selection,
+                              repositories=repositories, pulls=pulls)
+                results.append(result)
+                sys.stdout.write('{0:>5} repos {1:>6} PRs  {2:<6} {3:<11} {4:>7} calls {5:>9.3f}s {6:>9.2f} MB\n'
+                                 .format(repositories, pulls, selection, name, result['api_calls'],
+                                         result['wall_seconds'], result['peak_memory_mb']))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
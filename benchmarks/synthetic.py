@@ -0,0 +1,374 @@
+import json
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+from requests import Request
+from controllers.replay import StandInAdapter
+
+API = 'https://api.github.com'
+USERS = 50
+REVIEWS_PER_PULL = 2
+COLLABORATORS_PER_REPOSITORY = 10
+WEEKS = 52
+
+
+def timestamp(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def user_json(login):
+    url = '{0}/users/{1}'.format(API, login)
+    return {
+        'login': login, 'id': abs(hash(login)) % 10 ** 8, 'node_id': 'U_' + login,
+        'avatar_url': 'https://avatars.githubusercontent.com/u/1', 'gravatar_id': '', 'url': url,
+        'html_url': 'https://github.com/' + login, 'followers_url': url + '/followers',
+        'following_url': url + '/following{/other_user}', 'gists_url': url + '/gists{/gist_id}',
+        'starred_url': url + '/starred{/owner}{/repo}', 'subscriptions_url': url + '/subscriptions',
+        'organizations_url': url + '/orgs', 'repos_url': url + '/repos', 'events_url': url + '/events{/privacy}',
+        'received_events_url': url + '/received_events', 'type': 'User', 'site_admin': False
+    }
+
+
+def organization_json(organization):
+    url = '{0}/orgs/{1}'.format(API, organization)
+    return {
+        'login': organization, 'id': 1, 'node_id': 'O_1', 'url': url, 'repos_url': url + '/repos',
+        'events_url': url + '/events', 'hooks_url': url + '/hooks', 'issues_url': url + '/issues',
+        'members_url': url + '/members{/member}', 'public_members_url': url + '/public_members{/member}',
+        'avatar_url': 'https://avatars.githubusercontent.com/u/1', 'description': '', 'name': organization,
+        'company': None, 'blog': '', 'location': None, 'email': None, 'twitter_username': None,
+        'is_verified': False, 'has_organization_projects': True, 'has_repository_projects': True,
+        'public_repos': 0, 'public_gists': 0, 'followers': 0, 'following': 0,
+        'html_url': 'https://github.com/' + organization, 'created_at': '2015-01-01T00:00:00Z',
+        'updated_at': '2015-01-01T00:00:00Z', 'type': 'Organization'
+    }
+
+
+def repository_json(organization, name, index):
+    url = '{0}/repos/{1}/{2}'.format(API, organization, name)
+    templates = {
+        'archive_url': '/{archive_format}{/ref}', 'assignees_url': '/assignees{/user}',
+        'blobs_url': '/git/blobs{/sha}', 'branches_url': '/branches{/branch}',
+        'collaborators_url': '/collaborators{/collaborator}', 'comments_url': '/comments{/number}',
+        'commits_url': '/commits{/sha}', 'compare_url': '/compare/{base}...{head}',
+        'contents_url': '/contents/{+path}', 'contributors_url': '/contributors',
+        'deployments_url': '/deployments', 'downloads_url': '/downloads', 'events_url': '/events',
+        'forks_url': '/forks', 'git_commits_url': '/git/commits{/sha}', 'git_refs_url': '/git/refs{/sha}',
+        'git_tags_url': '/git/tags{/sha}', 'hooks_url': '/hooks', 'issue_comment_url': '/issues/comments{/number}',
+        'issue_events_url': '/issues/events{/number}', 'issues_url': '/issues{/number}', 'keys_url': '/keys{/key_id}',
+        'labels_url': '/labels{/name}', 'languages_url': '/languages', 'merges_url': '/merges',
+        'milestones_url': '/milestones{/number}', 'notifications_url': '/notifications{?since,all,participating}',
+        'pulls_url': '/pulls{/number}', 'releases_url': '/releases{/id}', 'stargazers_url': '/stargazers',
+        'statuses_url': '/statuses/{sha}', 'subscribers_url': '/subscribers', 'subscription_url': '/subscription',
+        'tags_url': '/tags', 'teams_url': '/teams', 'trees_url': '/git/trees{/sha}'
+    }
+    repository = {key: url + suffix for key, suffix in templates.items()}
+    repository.update({
+        'id': index + 1, 'node_id': 'R_{0}'.format(index), 'name': name,
+        'full_name': '{0}/{1}'.format(organization, name), 'owner': user_json(organization), 'private': True,
+        'html_url': 'https://github.com/{0}/{1}'.format(organization, name), 'description': '', 'fork': False,
+        'url': url, 'git_url': 'git://github.com/{0}/{1}.git'.format(organization, name),
+        'ssh_url': 'git@github.com:{0}/{1}.git'.format(organization, name),
+        'clone_url': 'https://github.com/{0}/{1}.git'.format(organization, name),
+        'svn_url': 'https://github.com/{0}/{1}'.format(organization, name), 'mirror_url': None,
+        'homepage': None, 'language': 'Python', 'forks_count': 0, 'forks': 0, 'stargazers_count': 0,
+        'watchers_count': 0, 'watchers': 0, 'size': 1, 'default_branch': 'main', 'open_issues_count': 0,
+        'open_issues': 0, 'is_template': False, 'topics': [], 'has_issues': True, 'has_projects': True,
+        'has_wiki': True, 'has_pages': False, 'has_downloads': True, 'archived': False, 'disabled': False,
+        'visibility': 'private', 'pushed_at': '2020-01-01T00:00:00Z', 'created_at': '2015-01-01T00:00:00Z',
+        'updated_at': '2020-01-01T00:00:00Z', 'permissions': {'admin': False, 'push': True, 'pull': True},
+        'license': None
+    })
+    return repository
+
+
+def connection(items, first, cursor):
+    """
+    Returns a page of a GraphQL connection, cursors being item offsets.
+    """
+    start = int(cursor or 0)
+    end = start + first
+    return {'pageInfo': {'hasNextPage': end < len(items), 'endCursor': str(end)}, 'nodes': items[start:end]}
+
+
+def graphql_user(user):
+    return {'login': user['login'], 'url': user['html_url']}
+
+
+class SyntheticGitHub(StandInAdapter):
+    """
+    Stand-in answering the GitHub REST, GraphQL and issue search endpoints used by the reports, and Slack's chat API,
+    for a generated organization of repositories repositories holding pulls pull requests in total.
+    Pull requests are spread over the last 90 days, one in five is open and half of those are blocked.
+    """
+
+    def __init__(self, organization, repositories, pulls, **kwargs):
+        super().__init__(**kwargs)
+        self.organization = organization
+        self.names = ['repository-{0:04d}'.format(index) for index in range(repositories)]
+        self.pulls_per_repository = max(pulls // repositories, 1)
+        self.now = datetime.now(tz=timezone.utc)
+        self.routes = [
+            (r'/orgs/[^/]+$', self.organization_answer),
+            (r'/orgs/[^/]+/repos$', self.repositories_answer),
+            (r'/orgs/[^/]+/(?:members|teams/[^/]+/members)$', self.members_answer),
+            (r'/orgs/[^/]+/outside_collaborators$', self.outside_collaborators_answer),
+            (r'/repos/[^/]+/([^/]+)$', self.repository_answer),
+            (r'/repos/[^/]+/([^/]+)/pulls$', self.pulls_answer),
+            (r'/repos/[^/]+/([^/]+)/pulls/(\d+)$', self.pull_answer),
+            (r'/repos/[^/]+/([^/]+)/pulls/(\d+)/reviews$', self.reviews_answer),
+            (r'/repos/[^/]+/([^/]+)/collaborators$', self.collaborators_answer),
+            (r'/repos/[^/]+/([^/]+)/stats/contributors$', self.statistics_answer),
+            (r'/search/issues$', self.search_answer),
+        ]
+
+    def respond(self, request):
+        parts = urlsplit(request.url)
+        if parts.path.startswith('/api/chat.'):
+            return self.answer({'ok': True, 'channel': 'C1', 'ts': '1.0'})
+        if parts.path == '/graphql':
+            return self.graphql_answer(json.loads(request.body))
+
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        for pattern, handler in self.routes:
+            match = re.match(pattern, parts.path)
+            if match:
+                return handler(query, *match.groups())
+        return self.answer({'message': 'Not Found'}, 404)
+
+    def answer(self, body, status=200, headers=None):
+        headers = dict(headers or {}, **{'Content-Type': 'application/json; charset=utf-8'})
+        return status, headers, json.dumps(body)
+
+    def page(self, path, query, items):
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        links = []
+        for relation, number in (('next', page + 1), ('last', last)):
+            if page < last:
+                links.append('<{0}{1}?{2}>; rel="{3}"'.format(API, path, urlencode(dict(query, page=number)), relation))
+        headers = {'Link': ', '.join(links)} if links else {}
+        return self.answer(items[(page - 1) * per_page: page * per_page], headers=headers)
+
+    def user(self, index):
+        return 'user-{0:03d}'.format(index % USERS)
+
+    def organization_answer(self, query):
+        return self.answer(organization_json(self.organization))
+
+    def repositories_answer(self, query):
+        return self.page('/orgs/{0}/repos'.format(self.organization), query,
+                         [repository_json(self.organization, name, index) for index, name in enumerate(self.names)])
+
+    def repository_answer(self, query, name):
+        if name not in self.names:
+            return self.answer({'message': 'Not Found'}, 404)
+        # The repository endpoint answers a few counts more than the listing.
+        return self.answer(dict(repository_json(self.organization, name, self.names.index(name)),
+                                network_count=0, subscribers_count=0))
+
+    def pull_json(self, name, number):
+        url = '{0}/repos/{1}/{2}/pulls/{3}'.format(API, self.organization, name, number)
+        html_url = 'https://github.com/{0}/{1}/pull/{2}'.format(self.organization, name, number)
+        created_at = self.now - timedelta(days=90) * (number - 1) / self.pulls_per_repository
+        state = 'open' if number % 5 == 0 else 'closed'
+        repository = repository_json(self.organization, name, self.names.index(name))
+        author = user_json(self.user(number))
+        return {
+            'url': url, 'id': number, 'node_id': 'PR_{0}'.format(number), 'html_url': html_url,
+            'diff_url': html_url + '.diff', 'patch_url': html_url + '.patch',
+            'issue_url': '{0}/repos/{1}/{2}/issues/{3}'.format(API, self.organization, name, number),
+            'commits_url': url + '/commits', 'review_comments_url': url + '/comments',
+            'review_comment_url': '{0}/repos/{1}/{2}/pulls/comments{{/number}}'.format(API, self.organization, name),
+            'comments_url': '{0}/repos/{1}/{2}/issues/{3}/comments'.format(API, self.organization, name, number),
+            'statuses_url': '{0}/repos/{1}/{2}/statuses/{3:040d}'.format(API, self.organization, name, number),
+            'number': number, 'state': state, 'locked': False, 'title': 'Change number {0}'.format(number),
+            'user': author, 'body': '', 'body_html': '', 'body_text': '', 'labels': [{
+                'id': 1, 'node_id': 'L_1', 'url': '{0}/repos/{1}/{2}/labels/BLOCKED'.format(API, self.organization, name),
+                'name': 'BLOCKED', 'description': '', 'color': 'ff0000', 'default': False
+            }] if number % 10 == 0 else [],
+            'milestone': None, 'active_lock_reason': None, 'created_at': timestamp(created_at),
+            'updated_at': timestamp(created_at + timedelta(hours=1)),
+            'closed_at': None if state == 'open' else timestamp(created_at + timedelta(hours=2)),
+            'merged_at': None, 'merge_commit_sha': None, 'assignee': None, 'assignees': [],
+            'requested_reviewers': [user_json(self.user(number + REVIEWS_PER_PULL + 1))], 'requested_teams': [],
+            'head': {'label': '{0}:feature-{1}'.format(self.organization, number), 'ref': 'feature-{0}'.format(number),
+                     'sha': '{0:040d}'.format(number), 'user': author, 'repo': repository},
+            'base': {'label': '{0}:main'.format(self.organization), 'ref': 'main', 'sha': '0' * 40,
+                     'user': user_json(self.organization), 'repo': repository},
+            '_links': {'self': {'href': url}, 'html': {'href': html_url}, 'issue': {'href': url},
+                       'comments': {'href': url + '/comments'}, 'review_comments': {'href': url + '/comments'},
+                       'review_comment': {'href': url + '/comments'}, 'commits': {'href': url + '/commits'},
+                       'statuses': {'href': url + '/statuses'}},
+            'author_association': 'MEMBER', 'auto_merge': None, 'draft': False
+        }
+
+    def pulls_answer(self, query, name):
+        if name not in self.names:
+            return self.answer({'message': 'Not Found'}, 404)
+
+        state = query.get('state', 'open')
+        numbers = range(1, self.pulls_per_repository + 1)
+        # Numbers grow with age, so newest first is ascending whatever the sort field.
+        if query.get('direction', 'desc') == 'asc':
+            numbers = reversed(numbers)
+        pulls = [self.pull_json(name, number) for number in numbers
+                 if state == 'all' or (state == 'open') == (number % 5 == 0)]
+        return self.page('/repos/{0}/{1}/pulls'.format(self.organization, name), query, pulls)
+
+    def pull_answer(self, query, name, number):
+        if name not in self.names or not 1 <= int(number) <= self.pulls_per_repository:
+            return self.answer({'message': 'Not Found'}, 404)
+        # The pull request endpoint answers a few counts more than the listing.
+        return self.answer(dict(self.pull_json(name, int(number)), additions=1, deletions=1, comments=0, commits=1,
+                                review_comments=0, mergeable=True, mergeable_state='clean', merged=False,
+                                merged_by=None))
+
+    def reviews_json(self, name, number):
+        url = '{0}/repos/{1}/{2}/pulls/{3}'.format(API, self.organization, name, number)
+        return [{
+            'id': number * 10 + index, 'node_id': 'PRR_{0}'.format(number * 10 + index),
+            'user': user_json(self.user(number + index + 1)), 'body': '', 'body_html': '', 'body_text': '',
+            'state': ('APPROVED', 'COMMENTED', 'CHANGES_REQUESTED')[(number + index) % 3],
+            'html_url': 'https://github.com/{0}/{1}/pull/{2}'.format(self.organization, name, number),
+            'pull_request_url': url, 'author_association': 'MEMBER',
+            '_links': {'html': {'href': url}, 'pull_request': {'href': url}},
+            'submitted_at': timestamp(self.now), 'commit_id': '{0:040d}'.format(number)
+        } for index in range(REVIEWS_PER_PULL)]
+
+    def reviews_answer(self, query, name, number):
+        number = int(number)
+        reviews = self.reviews_json(name, number)
+        return self.page('/repos/{0}/{1}/pulls/{2}/reviews'.format(self.organization, name, number), query, reviews)
+
+    def graphql_pull(self, name, number):
+        """
+        Returns the node of an open pull request with every connection complete, as lists.
+        """
+        pull = self.pull_json(name, number)
+        return {
+            'number': number, 'title': pull['title'], 'url': pull['html_url'], 'createdAt': pull['created_at'],
+            'updatedAt': pull['updated_at'], 'author': graphql_user(pull['user']),
+            'labels': [{'name': label['name']} for label in pull['labels']],
+            'reviews': [{'state': review['state'], 'author': graphql_user(review['user'])}
+                        for review in self.reviews_json(name, number)],
+            'reviewRequests': [{'requestedReviewer': graphql_user(user)} for user in pull['requested_reviewers']]
+        }
+
+    def graphql_pulls(self, query, name, cursor):
+        """
+        Returns a page of the open pull requests of a repository, newest first, with the first page of their
+        connections. The page sizes are the ones of the query.
+        """
+        first = int(re.search(r'pullRequests\(states: OPEN, first: (\d+)', query).group(1))
+        sizes = {field: int(size) for field, size in re.findall(r'(labels|reviews|reviewRequests)\(first: (\d+)\)',
+                                                                  query)}
+        page = connection([number for number in range(1, self.pulls_per_repository + 1) if number % 5 == 0],
+                          first, cursor)
+        nodes = []
+        for number in page['nodes']:
+            node = self.graphql_pull(name, number)
+            nodes.append(dict(node, **{field: connection(node[field], size, None) for field, size in sizes.items()}))
+        return dict(page, nodes=nodes)
+
+    def graphql_answer(self, body):
+        """
+        Answers the organization, repository and pull request connection queries of the GraphQL backend.
+        Queries are told apart by their text, page sizes are read from it.
+        """
+        query, variables = body['query'], body['variables']
+
+        if 'organization(login' in query:
+            first = int(re.search(r'repositories\(first: (\d+)', query).group(1))
+            page = connection(self.names, first, variables['cursor'])
+            nodes = [{'name': name, 'pullRequests': self.graphql_pulls(query, name, None)}
+                     for name in page['nodes']]
+            return self.answer({'data': {'organization': {'repositories': dict(page, nodes=nodes)}}})
+
+        if variables['name'] not in self.names:
+            return self.answer({'data': {'repository': None}, 'errors': [{
+                'type': 'NOT_FOUND', 'path': ['repository'],
+                'message': "Could not resolve to a Repository with the name '{0}'.".format(variables['name'])}]})
+
+        if 'pullRequest(number' in query:
+            field, first = re.search(r'(\w+)\(first: (\d+), after: \$cursor\)', query).groups()
+            items = self.graphql_pull(variables['name'], variables['number'])[field]
+            return self.answer({'data': {'repository': {'pullRequest': {
+                field: connection(items, int(first), variables['cursor'])}}}})
+
+        return self.answer({'data': {'repository': {
+            'pullRequests': self.graphql_pulls(query, variables['name'], variables['cursor'])}}})
+
+    def members_answer(self, query):
+        return self.page('/orgs/{0}/members'.format(self.organization), query,
+                         [user_json(self.user(index)) for index in range(USERS)])
+
+    def outside_collaborators_answer(self, query):
+        return self.page('/orgs/{0}/outside_collaborators'.format(self.organization), query, [])
+
+    def collaborators_answer(self, query, name):
+        if query.get('affiliation') == 'outside':
+            return self.page('/repos/{0}/{1}/collaborators'.format(self.organization, name), query, [])
+        offset = self.names.index(name)
+        users = [dict(user_json(self.user(offset + index)), permissions={'pull': True, 'push': True, 'admin': False})
+                 for index in range(COLLABORATORS_PER_REPOSITORY)]
+        return self.page('/repos/{0}/{1}/collaborators'.format(self.organization, name), query, users)
+
+    def statistics_answer(self, query, name):
+        offset = self.names.index(name)
+        start = int((self.now - timedelta(weeks=WEEKS)).timestamp())
+        contributors = [{
+            'author': user_json(self.user(offset + index)), 'total': WEEKS,
+            'weeks': [{'w': start + week * 604800, 'a': 10 * index, 'd': index, 'c': 1} for week in range(WEEKS)]
+        } for index in range(COLLABORATORS_PER_REPOSITORY)]
+        return self.answer(contributors)
+
+    def search_answer(self, query):
+        """
+        Counts the pull requests matching the repo:, created:>= and reviewed-by: qualifiers of a search.
+        Only total_count is answered, the items are left empty.
+        """
+        qualifiers = {}
+        for term in query.get('q', '').split():
+            key, _, value = term.partition(':')
+            qualifiers.setdefault(key, []).append(value)
+
+        names = [value.split('/')[-1] for value in qualifiers.get('repo', [])] or self.names
+        since = qualifiers.get('created', ['>=1970-01-01'])[0].lstrip('>=')
+        reviewer = qualifiers.get('reviewed-by', [None])[0]
+
+        count = 0
+        for name in names:
+            for number in range(1, self.pulls_per_repository + 1):
+                created_at = self.now - timedelta(days=90) * (number - 1) / self.pulls_per_repository
+                if timestamp(created_at)[:10] < since:
+                    break
+                if reviewer is None or reviewer in [self.user(number + index + 1) for index in range(REVIEWS_PER_PULL)]:
+                    count += 1
+        return self.answer({'total_count': count, 'incomplete_results': False, 'items': []})
+
+
+def serve(adapter):
+    """
+    Serves the answers of a stand-in adapter over HTTP on a free local port, for clients that do not go
+    through a requests session such as the async backend. Returns the server and its base URL.
+    """
+    class StandInHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            response = adapter.send(Request('GET', API + self.path).prepare())
+            self.send_response(response.status_code)
+            for name, value in response.headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:{0}'.format(server.server_address[1])
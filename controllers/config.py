@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+from dataclasses import dataclass
+
+REQUIRED = ('GITHUB_API_TOKEN', 'ORGANIZATION', 'SLACK_API_TOKEN')
+
+BACKENDS = ('rest', 'graphql', 'async')
+REVIEW_COUNT_STRATEGIES = ('auto', 'walk', 'search')
+
+current = None
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Settings of a run, read from the environment the first time a report needs them.
+    """
+    github_api_token: str
+    organization: str
+    slack_api_token: str
+    slack_channel: str = 'developatheneabot'
+    slack_api_url: str = 'https://slack.com/api'
+    slack_retries: int = 5
+    slack_queue_size: int = 10
+    slack_workers: int = 4
+    slack_state_file: str = None
+    time_evaluated: int = 30
+    max_pr_to_check: int = 200
+    max_workers: int = 1
+    github_backend: str = 'rest'
+    repository_index_path: str = None
+    repository_index_ttl: int = 86400
+    stats_deadline: int = 60
+    stats_backoff: float = 1.0
+    org_roster_path: str = None
+    org_roster_ttl: int = 86400
+    roster_teams: tuple = ()
+    review_count_strategy: str = 'auto'
+    min_of_review: int = 0
+    order_criteria: str = 'Top'
+    ranking_qty: int = 5
+    time_windows: tuple = ()
+    contribution_windows: tuple = ()
+    contributor_stats_ttl: int = 21600
+    rate_limit_reserve: int = 50
+    rate_limit_pace_below: int = 500
+    rate_limit_retries: int = 3
+    http_cache_max_mb: int = 100
+    async_concurrency: int = 100
+    replay_latency: float = 0.0
+    replay_rate_limit: int = 0
+    replay_stats_pending: int = 0
+    webhook_port: int = 0
+    webhook_host: str = '127.0.0.1'
+    webhook_secret: str = None
+    daemon_resync: int = 21600
+    daemon_schedule: tuple = (('reminder', 3600),)
+    ignore_words: tuple = ()
+    ignore_users: tuple = ()
+    user_names: tuple = ()
+    repositories: tuple = ()
+    repository_regex: str = None
+    slack_routes: str = None
+    pr_store_path: str = None
+    contributor_store_path: str = None
+    http_cache_dir: str = None
+    http_record_file: str = None
+    http_replay_file: str = None
+    github_api_url: str = 'https://api.github.com'
+    github_graphql_url: str = 'https://api.github.com/graphql'
+    run_report_file: str = None
+    metrics_file: str = None
+
+
+def split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def load(environ=os.environ):
+    """
+    Builds the Config of environ. Raises ValueError listing every missing or invalid variable.
+    """
+    errors = ['{0} is not set'.format(name) for name in REQUIRED if not environ.get(name)]
+    values = {}
+
+    def number(name, key, kind=int):
+        if environ.get(name):
+            try:
+                values[key] = kind(environ[name])
+            except ValueError:
+                errors.append('{0} is not a number: {1}'.format(name, environ[name]))
+
+    def numbers(name, key):
+        try:
+            values[key] = tuple(int(item) for item in split(environ.get(name)))
+        except ValueError:
+            errors.append('{0} is not a list of numbers: {1}'.format(name, environ[name]))
+
+    def choice(name, key, choices):
+        if environ.get(name):
+            if environ[name].lower() not in choices:
+                errors.append('{0} must be one of {1}: {2}'.format(name, ', '.join(choices), environ[name]))
+            values[key] = environ[name].lower()
+
+    for name in ('SLACK_RETRIES', 'SLACK_QUEUE_SIZE', 'SLACK_WORKERS', 'TIME_EVALUATED', 'MAX_PR_TO_CHECK',
+                 'MAX_WORKERS', 'REPOSITORY_INDEX_TTL', 'STATS_DEADLINE', 'ORG_ROSTER_TTL', 'MIN_OF_REVIEW',
+                 'RANKING_QTY', 'CONTRIBUTOR_STATS_TTL', 'RATE_LIMIT_RESERVE', 'RATE_LIMIT_PACE_BELOW',
+                 'RATE_LIMIT_RETRIES', 'HTTP_CACHE_MAX_MB', 'ASYNC_CONCURRENCY', 'REPLAY_RATE_LIMIT',
+                 'REPLAY_STATS_PENDING', 'WEBHOOK_PORT', 'DAEMON_RESYNC'):
+        number(name, name.lower())
+    number('STATS_BACKOFF', 'stats_backoff', float)
+    number('REPLAY_LATENCY', 'replay_latency', float)
+    numbers('TIME_WINDOWS', 'time_windows')
+    numbers('CONTRIBUTION_WINDOWS', 'contribution_windows')
+    choice('GITHUB_BACKEND', 'github_backend', BACKENDS)
+    choice('REVIEW_COUNT_STRATEGY', 'review_count_strategy', REVIEW_COUNT_STRATEGIES)
+
+    for name in ('SLACK_CHANNEL', 'SLACK_STATE_FILE', 'REPOSITORY_INDEX_PATH', 'ORG_ROSTER_PATH', 'ORDER_CRITERIA',
+                 'REPOSITORY_REGEX', 'SLACK_ROUTES', 'PR_STORE_PATH', 'CONTRIBUTOR_STORE_PATH', 'HTTP_CACHE_DIR',
+                 'HTTP_RECORD_FILE', 'HTTP_REPLAY_FILE', 'GITHUB_API_URL', 'GITHUB_GRAPHQL_URL', 'WEBHOOK_HOST',
+                 'WEBHOOK_SECRET', 'RUN_REPORT_FILE', 'METRICS_FILE'):
+        if environ.get(name):
+            values[name.lower()] = environ[name]
+    if environ.get('SLACK_API_URL'):
+        values['slack_api_url'] = environ['SLACK_API_URL'].rstrip('/')
+    values['roster_teams'] = tuple(sorted(set(split(environ.get('ROSTER_TEAMS')))))
+    # Words, logins and repository names are compared lower-cased.
+    for name in ('IGNORE_WORDS', 'IGNORE_USERS', 'USER_NAMES', 'REPOSITORIES'):
+        values[name.lower()] = tuple(sorted({item.lower() for item in split(environ.get(name))}))
+
+    if environ.get('DAEMON_SCHEDULE'):
+        schedule = []
+        for entry in split(environ['DAEMON_SCHEDULE']):
+            name, _, seconds = entry.partition('=')
+            try:
+                schedule.append((name.strip(), int(seconds)))
+            except ValueError:
+                errors.append('DAEMON_SCHEDULE entries must be report=seconds: {0}'.format(entry))
+        values['daemon_schedule'] = tuple(schedule)
+
+    if environ.get('REPOSITORY_REGEX'):
+        try:
+            re.compile(environ['REPOSITORY_REGEX'])
+        except re.error as error:
+            errors.append('REPOSITORY_REGEX is not a regular expression: {0}'.format(error))
+
+    if errors:
+        raise ValueError('\n'.join(errors))
+
+    time_evaluated = values.get('time_evaluated', Config.time_evaluated)
+    # The windows default to TIME_EVALUATED, in days for the pull requests and in weeks for the commits.
+    values['time_windows'] = values['time_windows'] or (time_evaluated,)
+    values['contribution_windows'] = values['contribution_windows'] or (time_evaluated,)
+
+    return Config(github_api_token=environ['GITHUB_API_TOKEN'], organization=environ['ORGANIZATION'],
+                  slack_api_token=environ['SLACK_API_TOKEN'], **values)
+
+
+def get():
+    """
+    Returns the Config of the process, built on the first call. Exits when the environment is not valid.
+    """
+    global current
+
+    if current is None:
+        try:
+            current = load()
+        except ValueError as error:
+            sys.stderr.write('Please check the environment variables:\n{0}\n'.format(error))
+            sys.exit(1)
+    return current
+
+
+def validate():
+    """
+    Checks the environment up front, so that a run does not stop halfway through on a missing token.
+    """
+    get()
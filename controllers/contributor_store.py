@@ -0,0 +1,104 @@
+import os
+import time
+import sqlite3
+import controllers.config as config
+
+WEEK = 604800
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS contributor_weeks (
+    repository TEXT NOT NULL,
+    author TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    commits INTEGER NOT NULL,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    PRIMARY KEY (repository, author, week)
+);
+CREATE INDEX IF NOT EXISTS contributor_weeks_week ON contributor_weeks (week);
+CREATE TABLE IF NOT EXISTS contributor_sync (
+    repository TEXT PRIMARY KEY,
+    last_week INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+'''
+
+
+def week_start(value):
+    # github3 converts the week timestamps to datetimes, the async backend keeps them as sent.
+    return value if isinstance(value, int) else int(value.timestamp())
+
+
+class ContributorStore:
+    """
+    SQLite store of weekly contributor statistics, one row per repository, author and week with activity.
+    Only the weeks from the last stored one on are rewritten, except for authors seen for the first time.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path if path == ':memory:' else os.path.expanduser(path),
+                                          check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def is_fresh(self, repository, ttl=None):
+        """
+        Returns True when the repository was synchronised less than ttl seconds ago, CONTRIBUTOR_STATS_TTL
+        by default.
+        """
+        ttl = config.get().contributor_stats_ttl if ttl is None else ttl
+        row = self.connection.execute('SELECT synced_at FROM contributor_sync WHERE repository = ?',
+                                      (repository,)).fetchone()
+        return row is not None and time.time() - row[0] < ttl
+
+    def save(self, repository, contributions):
+        """
+        Saves the contributor statistics of a repository, as answered by GitHub with author and weeks.
+        """
+        row = self.connection.execute('SELECT last_week FROM contributor_sync WHERE repository = ?',
+                                      (repository,)).fetchone()
+        last_week = row[0] if row else None
+        known = {author for author, in self.connection.execute(
+            'SELECT DISTINCT author FROM contributor_weeks WHERE repository = ?', (repository,))}
+
+        rows = []
+        newest = last_week or 0
+        for contrib in contributions:
+            login = contrib.author.login
+            for week in contrib.weeks:
+                start = week_start(week['w'])
+                newest = max(newest, start)
+                # The last stored week was still in progress, older ones do not change.
+                if login in known and start < last_week:
+                    continue
+                if week['c'] or week['a'] or week['d']:
+                    rows.append((repository, login, start, week['c'], week['a'], week['d']))
+
+        with self.connection:
+            self.connection.execute('DELETE FROM contributor_weeks WHERE repository = ? AND week >= ?',
+                                    (repository, last_week or 0))
+            self.connection.executemany('INSERT OR REPLACE INTO contributor_weeks VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self.connection.execute('INSERT OR REPLACE INTO contributor_sync VALUES (?, ?, ?)',
+                                    (repository, newest, time.time()))
+
+    def last_week(self, repositories):
+        marks = ', '.join('?' * len(repositories))
+        row = self.connection.execute('SELECT MAX(last_week) FROM contributor_sync WHERE repository IN ({0})'
+                                      .format(marks), list(repositories)).fetchone()
+        return row[0]
+
+    def totals(self, repositories, weeks, offset=0):
+        """
+        Returns the commits, additions and deletions per author over the weeks weeks ending offset weeks
+        before the last stored week of the repositories.
+        """
+        last_week = self.last_week(repositories) if repositories else None
+        if last_week is None:
+            return {}
+
+        until = last_week - offset * WEEK
+        marks = ', '.join('?' * len(repositories))
+        return {author: {'commits': commits, 'additions': additions, 'deletions': deletions}
+                for author, commits, additions, deletions in self.connection.execute(
+                    'SELECT author, SUM(commits), SUM(additions), SUM(deletions) FROM contributor_weeks '
+                    'WHERE repository IN ({0}) AND week > ? AND week <= ? GROUP BY author'.format(marks),
+                    list(repositories) + [until - weeks * WEEK, until])}
@@ -0,0 +1,49 @@
+import re
+import functools
+import controllers.config as config
+
+
+@functools.lru_cache(maxsize=None)
+def words_pattern(words):
+    """
+    Returns every word in one alternation, longest first, so a title is scanned once. None without words.
+    """
+    return re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))) if words else None
+
+
+@functools.lru_cache(maxsize=None)
+def compile_pattern(expression):
+    return re.compile(expression) if expression else None
+
+
+def repository_pattern():
+    """
+    Returns REPOSITORY_REGEX compiled, None when it is unset. Compiled on first use, once config.load checked it.
+    """
+    return compile_pattern(config.get().repository_regex)
+
+
+def is_ignored_user(login):
+    return login.lower() in config.get().ignore_users
+
+
+def is_listed_user(login):
+    """
+    Returns True when USER_NAMES is unset or contains login.
+    """
+    user_names = config.get().user_names
+    return not user_names or login.lower() in user_names
+
+
+def is_valid_title(title):
+    pattern = words_pattern(config.get().ignore_words)
+    return pattern is None or pattern.search(title.lower()) is None
+
+
+def is_selected_repository(name):
+    """
+    Returns True when the repository is named in REPOSITORIES or its name matches REPOSITORY_REGEX from the start.
+    """
+    name = name.lower()
+    pattern = repository_pattern()
+    return name in config.get().repositories or (pattern is not None and pattern.match(name) is not None)
@@ -0,0 +1,303 @@
+import re
+import json
+import time
+import queue
+import asyncio
+import threading
+from types import SimpleNamespace
+import aiohttp
+import controllers.config as config
+import controllers.rate_limit as rate_limit
+import controllers.instrumentation as instrumentation
+from controllers.records import rest_datetime, rest_user, from_rest
+
+PER_PAGE = 100
+LAST_PAGE = re.compile(r'[?&]page=(\d+)>; rel="last"')
+
+
+class Client:
+    """
+    Pooled aiohttp session for the GitHub REST API, sharing the rate limit gate of the synchronous sessions.
+    """
+
+    def __init__(self, token, organization):
+        self.token = token
+        self.organization = organization
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers={'Authorization': 'token {0}'.format(self.token), 'Accept': 'application/vnd.github.v3+json'},
+            connector=aiohttp.TCPConnector(limit=config.get().async_concurrency))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def get(self, path, **params):
+        """
+        Returns the status, decoded body and headers of a GET request. A 202 answer has no body.
+        """
+        retries = config.get().rate_limit_retries
+        for attempt in range(retries + 1):
+            resource = rate_limit.resource(path)
+            delay = rate_limit.gate.reserve(resource)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self.session.get(config.get().github_api_url + path, params=params) as response:
+                retry = rate_limit.gate.update(SimpleNamespace(status_code=response.status, headers=response.headers),
+                                               resource)
+                if retry and attempt < retries:
+                    continue
+                response.raise_for_status()
+                body = await response.read()
+                instrumentation.record_response('GET', str(response.url), len(body))
+                if response.status == 202:
+                    return response.status, None, response.headers
+                return response.status, json.loads(body), response.headers
+
+    async def get_all(self, path, **params):
+        """
+        Returns every item of a paginated listing, fetching the pages after the first one concurrently.
+        """
+        params['per_page'] = PER_PAGE
+        _, items, headers = await self.get(path, **params)
+        match = LAST_PAGE.search(headers.get('Link', ''))
+        if not match:
+            return items
+
+        pages = await asyncio.gather(*[self.get(path, page=page, **params)
+                                       for page in range(2, int(match.group(1)) + 1)])
+        for _, page_items, _ in pages:
+            items += page_items
+        return items
+
+    def repository_path(self, name, suffix=''):
+        return '/repos/{0}/{1}{2}'.format(self.organization, name, suffix)
+
+    async def repositories(self):
+        return await self.get_all('/orgs/{0}/repos'.format(self.organization))
+
+    async def repository(self, name):
+        try:
+            _, repository, _ = await self.get(self.repository_path(name))
+        except aiohttp.ClientResponseError as error:
+            if error.status == 404:
+                return None
+            raise
+        return repository
+
+    async def open_pulls(self, name):
+        return await self.get_all(self.repository_path(name, '/pulls'), state='open')
+
+    async def pulls_until(self, name, sort, field, since, limit=None):
+        """
+        Returns the pull requests of a repository sorted by field, newest first, down to since.
+        """
+        pulls = []
+        page = 1
+
+        while limit is None or len(pulls) < limit:
+            _, items, _ = await self.get(self.repository_path(name, '/pulls'), state='all', sort=sort,
+                                         direction='desc', per_page=PER_PAGE, page=page)
+            for item in items:
+                if rest_datetime(item[field]) <= since or (limit is not None and len(pulls) >= limit):
+                    return pulls
+                pulls.append(item)
+            if len(items) < PER_PAGE:
+                break
+            page += 1
+        return pulls
+
+    async def reviews(self, name, number):
+        return await self.get_all(self.repository_path(name, '/pulls/{0}/reviews'.format(number)))
+
+    async def collaborators(self, name, affiliation='all'):
+        return await self.get_all(self.repository_path(name, '/collaborators'), affiliation=affiliation)
+
+    async def logins(self, path):
+        """
+        Returns the logins of a user listing, or None when the token may not read it.
+        """
+        try:
+            return [user['login'] for user in await self.get_all(path)]
+        except aiohttp.ClientResponseError as error:
+            if error.status in (403, 404):
+                return None
+            raise
+
+    async def search_count(self, query):
+        _, result, _ = await self.get('/search/issues', q=query, per_page=1)
+        return result['total_count']
+
+    async def contributor_statistics(self, name):
+        status, contributions, _ = await self.get(self.repository_path(name, '/stats/contributors'))
+        return None if status == 202 else contributions or []
+
+
+def run(token, organization, function):
+    """
+    Runs function(client) on a fresh event loop and returns its result, for synchronous callers.
+    """
+    async def main():
+        async with Client(token, organization) as client:
+            return await function(client)
+
+    return asyncio.run(main())
+
+
+def iterate(token, organization, function):
+    """
+    Runs the async generator function(client) on an event loop in a background thread and yields its
+    items to the synchronous caller as they are produced.
+    """
+    items = queue.Queue()
+    done = object()
+
+    def worker():
+        async def main():
+            async with Client(token, organization) as client:
+                async for item in function(client):
+                    items.put((item, None))
+
+        try:
+            asyncio.run(main())
+            items.put((done, None))
+        except BaseException as error:
+            items.put((done, error))
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    while True:
+        item, error = items.get()
+        if error is not None:
+            raise error
+        if item is done:
+            return
+        yield item
+
+
+def fetch_organization_repositories(token, organization):
+    return [SimpleNamespace(name=repository['name'])
+            for repository in run(token, organization, lambda client: client.repositories())]
+
+
+def fetch_repositories_by_name(token, organization, names):
+    async def fetch(client):
+        return await asyncio.gather(*[client.repository(name) for name in names])
+
+    return [SimpleNamespace(name=repository['name']) if repository else None
+            for repository in run(token, organization, fetch)]
+
+
+async def fetch_pulls_with_reviews(client, pulls):
+    reviews = await asyncio.gather(*[client.reviews(pull['base']['repo']['name'], pull['number']) for pull in pulls])
+    return [from_rest(pull, pull_reviews) for pull, pull_reviews in zip(pulls, reviews)]
+
+
+def iterate_open_pulls(token, organization, names, is_selected):
+    """
+    Yields the open pull requests kept by is_selected, with their reviews, repository after repository.
+    Every repository is fetched concurrently, the first ones are yielded as soon as they are complete.
+    """
+    async def fetch_repository(client, name):
+        pulls = await client.open_pulls(name)
+        return await fetch_pulls_with_reviews(client, [pull for pull in pulls if is_selected(from_rest(pull))])
+
+    async def fetch(client):
+        tasks = [asyncio.ensure_future(fetch_repository(client, name)) for name in names]
+        for task in tasks:
+            for pull in await task:
+                yield pull
+
+    return iterate(token, organization, fetch)
+
+
+def fetch_window_pulls(token, organization, names, since, limit, with_reviews):
+    """
+    Returns the pull requests of each repository created after since, at most limit per repository.
+    """
+    async def fetch(client):
+        repositories_pulls = await asyncio.gather(*[client.pulls_until(name, 'created', 'created_at', since, limit)
+                                                    for name in names])
+        if not with_reviews:
+            return [[from_rest(pull) for pull in pulls] for pulls in repositories_pulls]
+        return await asyncio.gather(*[fetch_pulls_with_reviews(client, pulls) for pulls in repositories_pulls])
+
+    return run(token, organization, fetch)
+
+
+def fetch_created_pulls(token, organization, names, ranges):
+    """
+    Returns the pull requests of each repository created within its (since, until) range, with their reviews.
+    """
+    async def fetch(client):
+        repositories_pulls = await asyncio.gather(*[client.pulls_until(name, 'created', 'created_at', since)
+                                                    for name, (since, _) in zip(names, ranges)])
+        return await asyncio.gather(*[
+            fetch_pulls_with_reviews(client, [pull for pull in pulls if rest_datetime(pull['created_at']) < until])
+            for pulls, (_, until) in zip(repositories_pulls, ranges)])
+
+    return run(token, organization, fetch)
+
+
+def fetch_updated_pulls(token, organization, names, marks):
+    """
+    Returns the pull requests of each repository updated after its mark, with their reviews.
+    """
+    async def fetch(client):
+        repositories_pulls = await asyncio.gather(*[client.pulls_until(name, 'updated', 'updated_at', mark)
+                                                    for name, mark in zip(names, marks)])
+        return await asyncio.gather(*[fetch_pulls_with_reviews(client, pulls) for pulls in repositories_pulls])
+
+    return run(token, organization, fetch)
+
+
+def fetch_user_logins(token, organization, paths):
+    async def fetch(client):
+        return await asyncio.gather(*[client.logins(path) for path in paths])
+
+    return run(token, organization, fetch)
+
+
+def fetch_collaborators(token, organization, names, affiliation='all'):
+    async def fetch(client):
+        collaborators = await asyncio.gather(*[client.collaborators(name, affiliation) for name in names])
+        return [[rest_user(user) for user in users] for users in collaborators]
+
+    return run(token, organization, fetch)
+
+
+def fetch_search_counts(token, organization, queries):
+    async def fetch(client):
+        return await asyncio.gather(*[client.search_count(query) for query in queries])
+
+    return run(token, organization, fetch)
+
+
+def fetch_contributor_statistics(token, organization, names, deadline, backoff):
+    """
+    Returns the contributor statistics per repository name, polling the ones GitHub is still computing
+    with exponential backoff until deadline seconds have passed, and the names that never resolved.
+    """
+    async def fetch(client):
+        end = time.monotonic() + deadline
+        results = dict(zip(names, await asyncio.gather(*[client.contributor_statistics(name) for name in names])))
+        pending = [name for name in names if results[name] is None]
+        delay = backoff
+
+        while pending and time.monotonic() + delay <= end:
+            await asyncio.sleep(delay)
+            results.update(zip(pending, await asyncio.gather(*[client.contributor_statistics(name)
+                                                               for name in pending])))
+            pending = [name for name in pending if results[name] is None]
+            delay *= 2
+
+        return results, pending
+
+    results, pending = run(token, organization, fetch)
+    statistics = {name: None if contributions is None else [
+        SimpleNamespace(author=rest_user(contrib['author']), weeks=contrib['weeks']) for contrib in contributions]
+        for name, contributions in results.items()}
+    return statistics, pending
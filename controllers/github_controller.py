@@ -1,80 +1,222 @@
-import re
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-import os
 import sys
-from github3 import login
-from github3.exceptions import UnprocessableResponseBody
+import controllers.config as config
+import controllers.filters as filters
+import controllers.records as records
+import controllers.ttl_cache as ttl_cache
+import controllers.rate_limit as rate_limit
+import controllers.instrumentation as instrumentation
+from controllers.pull_request_store import PullRequestStore
+from controllers.contributor_store import ContributorStore
 
 BLOCKED_LABEL = 'BLOCKED'
 
-ignore = os.environ.get('IGNORE_WORDS')
-IGNORE_WORDS = [i.lower().strip() for i in ignore.split(',')] if ignore else []
+# Repositories per page of the organization listing, by github3 and the async backend.
+LISTING_PAGE_SIZE = 100
 
-ignore_users = os.environ.get('IGNORE_USERS', '').lower()
-IGNORE_USERS = [i.strip() for i in ignore_users.split(',')] if ignore_users else []
+# GitHub refuses search queries longer than 256 characters.
+SEARCH_QUERY_LIMIT = 256
 
-repositories = os.environ.get('REPOSITORIES').lower()
-REPOSITORIES = [r.strip() for r in repositories.split(',')] if repositories else []
 
-REPOSITORY_REGEX = os.environ.get('REPOSITORY_REGEX', None)
+client = None
 
-user_names = os.environ.get('USER_NAMES')
-USER_NAMES = [u.lower().strip() for u in user_names.split(',')] if user_names else []
+# Data fetched during this process, shared by every report run in it.
+run_cache = {}
 
-TIME_EVALUATED = int(os.environ.get('TIME_EVALUATED', 30))
 
-MAX_PR_TO_CHECK = int(os.environ.get('MAX_PR_TO_CHECK', 200))
+def get_client():
+    """
+    Returns the authenticated GitHub client, logging in once per process.
+    """
+    global client
 
-try:
-    GITHUB_API_TOKEN = os.environ['GITHUB_API_TOKEN']
-    ORGANIZATION = os.environ['ORGANIZATION']
-except KeyError as error:
-    sys.stderr.write('Please set the environment variable {0}'.format(error))
-    sys.exit(1)
+    if client is None:
+        # github3 and requests are only imported once a report talks to GitHub.
+        from github3 import login
+        import controllers.http_cache as http_cache
+        import controllers.replay as replay
 
+        settings = config.get()
+        client = login(token=settings.github_api_token)
+        http_cache.install(client.session, pool_maxsize=max(10, settings.max_workers))
+        rate_limit.install(client.session)
+        replay.install(client.session)
+        instrumentation.install(client.session)
+    return client
 
-def fetch_organization_repositories():
+
+@instrumentation.timed
+def fetch_organization_repositories(with_open_pulls=False):
     """
     Returns a list of repositories for the ORGANIZATION filtered by REPOSITORIES environment Variable.
+    Repositories named in REPOSITORIES are fetched directly, the organization is only listed for
+    REPOSITORY_REGEX, through a name index cached for REPOSITORY_INDEX_TTL seconds.
+    With GITHUB_BACKEND=graphql and with_open_pulls the repositories come with their open pull requests
+    already fetched. The graphql backend only serves open pull requests, the ranking reports get REST
+    repositories.
     """
-    pattern = None
-    client = login(token=GITHUB_API_TOKEN)
-    organization = client.organization(ORGANIZATION)
-    if REPOSITORY_REGEX is not None or REPOSITORY_REGEX != '':
-        pattern = re.compile(REPOSITORY_REGEX)
+    settings = config.get()
+    key = 'graphql_repositories' if with_open_pulls and settings.github_backend == 'graphql' else 'repositories'
+    if key in run_cache:
+        return list(run_cache[key])
+
+    if key == 'graphql_repositories' and filters.repository_pattern() is None:
+        repositories = fetch_repositories_by_name(sorted(settings.repositories), with_open_pulls=True)
+    elif key == 'graphql_repositories':
+        import controllers.github_graphql_controller as graphql
+        repositories = graphql.fetch_organization_repositories(settings.github_api_token, settings.organization,
+                                                               filters.is_selected_repository)
+    elif filters.repository_pattern() is None:
+        repositories = fetch_repositories_by_name(sorted(settings.repositories))
+    else:
+        names = (ttl_cache.load(settings.repository_index_path, settings.repository_index_ttl)
+                 if settings.repository_index_path else None)
+        wanted = None
+        if names is not None:
+            indexed = {name.lower() for name in names}
+            wanted = ([name for name in names if filters.is_selected_repository(name)]
+                      + sorted(name for name in settings.repositories if name not in indexed))
+            # A repository fetched by name costs a call, listing the organization one per page.
+            if len(wanted) > -(-len(names) // LISTING_PAGE_SIZE):
+                wanted = None
+
+        if wanted is None:
+            listed = list_organization_repositories()
+            if settings.repository_index_path:
+                ttl_cache.save(settings.repository_index_path, [repository.name for repository in listed])
+            repositories = [repository for repository in listed if filters.is_selected_repository(repository.name)]
+        else:
+            repositories = fetch_repositories_by_name(wanted)
+
+    repos = sorted(repositories, key=lambda repository: repository.name.lower())
+
+    run_cache[key] = repos
+    return list(repos)
+
 
-    repos = []
+def list_organization_repositories():
+    settings = config.get()
+    if settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        return asynchronous.fetch_organization_repositories(settings.github_api_token, settings.organization)
+    return list(get_client().organization(settings.organization).repositories())
 
-    for repository in organization.repositories():
-        if ((len(REPOSITORIES) > 0 and repository.name.lower() in REPOSITORIES)
-                or (REPOSITORY_REGEX is not None and REPOSITORY_REGEX != '' and bool(
-                    pattern.match(str(repository.name.lower()))))):
-            repos.append(repository)
 
-    return repos
+def fetch_repositories_by_name(names, with_open_pulls=False):
+    """
+    Fetches the named repositories of the ORGANIZATION concurrently, skipping the ones that do not exist.
+    With GITHUB_BACKEND=graphql and with_open_pulls they come with their open pull requests.
+    """
+    settings = config.get()
+    if with_open_pulls and settings.github_backend == 'graphql':
+        import controllers.github_graphql_controller as graphql
+        repositories = parallel_map(lambda name: graphql.fetch_repository(settings.github_api_token,
+                                                                          settings.organization, name), names)
+    elif settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        repositories = asynchronous.fetch_repositories_by_name(settings.github_api_token, settings.organization, names)
+    else:
+        github = get_client()
+        repositories = parallel_map(lambda name: github.repository(settings.organization, name), names)
+
+    missing = [name for name, repository in zip(names, repositories) if repository is None]
+    if missing:
+        sys.stderr.write('Repositories not found in {0}: {1}\n'.format(settings.organization, ', '.join(missing)))
+
+    return [repository for repository in repositories if repository is not None]
+
+
+def parallel_imap(function, items, workers=None):
+    """
+    Yields function(item) for every item in input order, on workers threads, MAX_WORKERS by default.
+    items is consumed lazily by the calling thread, so it can itself be a generator fed by network calls.
+    Calls are queued ahead of the running ones to keep the threads busy meanwhile. Without workers, a
+    MAX_WORKERS of 1 runs serially on the calling thread.
+    """
+    if workers is None:
+        workers = config.get().max_workers
+        if workers <= 1:
+            for item in items:
+                yield function(item)
+            return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parallel_map(function, items):
+    """
+    Applies function to every item using up to MAX_WORKERS threads, returning the results in input order.
+    """
+    return list(parallel_imap(function, items))
 
 
+@instrumentation.timed
 def fetch_open_pulls_requests_formatted(repositories_list):
     """
-    Returns a formatted string list of open pull request messages.
+    Yields the formatted open pull request messages as their data arrives, in repository order.
     """
-    lines = []
+    yield from format_pull_requests(fetch_open_pull_records(repositories_list), config.get().organization)
 
-    for repository in repositories_list:
-        unchecked_pulls = fetch_repository_open_pulls(repository)
-        lines += format_pull_requests(unchecked_pulls, ORGANIZATION,
-                                      repository.name)
 
-    return lines
+def fetch_open_pull_records(repositories_list):
+    """
+    Yields records of the selected open pull requests, with their reviews, in repository order.
+    Reviews of the first repositories are fetched while the next repositories are still being listed.
+    """
+    settings = config.get()
+    if settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        yield from asynchronous.iterate_open_pulls(settings.github_api_token, settings.organization,
+                                                   [repository.name for repository in repositories_list],
+                                                   is_open_pull_selected)
+    elif settings.github_backend == 'graphql':
+        for repository in repositories_list:
+            yield from (pull for pull in repository.pulls if is_open_pull_selected(pull))
+    else:
+        # The calling thread lists the repositories while MAX_WORKERS - 1 threads fetch the reviews.
+        unchecked_pulls = ((pull, repository.name) for repository in repositories_list
+                           for pull in fetch_repository_open_pulls(repository))
+        workers = settings.max_workers - 1 if settings.max_workers > 1 else None
+
+        yield from parallel_imap(lambda item: records.from_github3(item[0], item[1], item[0].reviews()),
+                                 unchecked_pulls, workers)
+
+
+def is_author_selected(login):
+    return filters.is_listed_user(login) and not filters.is_ignored_user(login)
+
+
+def is_open_pull_selected(pull):
+    """
+    Returns True for an open pull request of a selected author without an ignored word in its title.
+    Checked before its reviews are requested.
+    """
+    return pull.state == 'open' and is_author_selected(pull.author.login) and filters.is_valid_title(pull.title)
+
+
+def fetch_pull_request_record(repository_name, number):
+    """
+    Returns the record of one pull request with its reviews, for webhook events about unknown pull requests.
+    """
+    pull = get_client().pull_request(config.get().organization, repository_name, number)
+    return records.from_github3(pull, repository_name, pull.reviews())
 
 
 def fetch_repository_open_pulls(repository):
     pulls = []
 
     for pull in repository.pull_requests():
-        if pull.state == 'open' and (not USER_NAMES or pull.user.login.lower() in USER_NAMES) and pull.user.login.lower() not in IGNORE_USERS:
+        if pull.state == 'open' and is_author_selected(pull.user.login) and filters.is_valid_title(pull.title):
             pulls.append(pull)
     return pulls
 
@@ -95,9 +237,9 @@ def duration(created_at):
 def get_review_statuses(pull):
     dict_reviews = defaultdict(set)
 
-    for review in pull.reviews():
-        if (review.user.login != pull.user.login
-                and review.user.login.lower() not in IGNORE_USERS):
+    for review in pull.reviews:
+        if (review.user.login != pull.author.login
+                and not filters.is_ignored_user(review.user.login)):
             if review.state == 'APPROVED':
                 state = 'Reviewers'
             elif review.state == 'CHANGES_REQUESTED' or review.state == 'COMMENTED':
@@ -110,7 +252,7 @@ def get_review_statuses(pull):
             dict_reviews[state].add('<{0}|{1}>'.format(review.user.html_url, review.user.login))
 
     for reviewer in pull.requested_reviewers:
-        if (reviewer.login.lower() not in IGNORE_USERS
+        if (not filters.is_ignored_user(reviewer.login)
                 and '<{0}|{1}>'.format(reviewer.html_url, reviewer.login) not in dict_reviews['Comment']):
             state = 'Pending'
             dict_reviews[state].add('<{0}|{1}>'.format(reviewer.html_url, reviewer.login))
@@ -128,17 +270,15 @@ def get_review_statuses(pull):
             if dict_reviews else '')
 
 
-def format_pull_requests(pull_requests, owner, repository):
-    lines = []
-
+def format_pull_requests(pull_requests, owner):
     for pull in pull_requests:
-        if is_valid_title(pull.title):
-            creator = pull.user.login
+        if filters.is_valid_title(pull.title):
+            creator = pull.author.login
             review_statuses = get_review_statuses(pull)
             c_since = duration(pull.created_at)
             text = ' » *[{1}]* <{2}|{3}#{8} - by {4}> - *Since {5} {6} {7}* '.format(
                 owner,
-                repository,
+                pull.repository,
                 pull.html_url,
                 pull.title,
                 creator,
@@ -146,98 +286,123 @@ def format_pull_requests(pull_requests, owner, repository):
                 c_since[1],
                 review_statuses,
                 pull.number)
-            lines.append({
+            yield {
                 "text": text,
+                "repository": pull.repository,
+                "number": pull.number,
+                "title": pull.title,
+                "author": creator,
+                "review_statuses": review_statuses,
                 "is_blocked": as_label(pull, BLOCKED_LABEL),
                 "reviews": count_pull_request_reviews(pull)
-            })
-
-    return lines
+            }
 
 
-def fetch_repository_all_pulls(repository):
+def fetch_repository_all_pulls(repository, window_start):
+    """
+    Returns the pull requests created since window_start, newest first.
+    Pagination stops at the first older pull request, MAX_PR_TO_CHECK only caps the listing.
+    """
     pulls = []
 
-    for pull in repository.pull_requests(state='all', number=MAX_PR_TO_CHECK):
-        if pull.created_at >= (datetime.now(tz=timezone.utc) + timedelta(-TIME_EVALUATED)):
-            pulls.append(pull)
+    for pull in repository.pull_requests(state='all', sort='created', direction='desc',
+                                         number=config.get().max_pr_to_check):
+        if pull.created_at < window_start:
+            break
+        pulls.append(pull)
     return pulls
 
 
-def is_valid_title(title):
-    lowercase_title = title.lower()
-    for ignored_word in IGNORE_WORDS:
-        if ignored_word in lowercase_title:
-            return False
+def request_contributor_statistics(repository):
+    """
+    Returns the contributor statistics of a repository, or None while GitHub is still computing them (202).
+    """
+    from github3.exceptions import UnprocessableResponseBody
 
-    return True
+    try:
+        return list(repository.contributor_statistics())
+    except UnprocessableResponseBody:
+        return None
 
 
-def get_last_statistics(weeks, parameter):
-    count = 0
-    for week in weeks:
-        count += week[parameter]
-    return count
+def fetch_all_contributor_statistics(repositories_list):
+    """
+    Fires the statistics request for every repository, then polls only the pending ones with
+    exponential backoff until STATS_DEADLINE seconds have passed.
+    Returns the statistics per repository name and the names of the repositories that never resolved.
+    """
+    settings = config.get()
+    if settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        return asynchronous.fetch_contributor_statistics(settings.github_api_token, settings.organization,
+                                                         [repository.name for repository in repositories_list],
+                                                         settings.stats_deadline, settings.stats_backoff)
+
+    deadline = time.monotonic() + settings.stats_deadline
+    results = dict(zip([repository.name for repository in repositories_list],
+                       parallel_map(request_contributor_statistics, repositories_list)))
+    pending = [repository for repository in repositories_list if results[repository.name] is None]
+    delay = settings.stats_backoff
+
+    while pending and time.monotonic() + delay <= deadline:
+        time.sleep(delay)
+        for repository, contributions in zip(pending, parallel_map(request_contributor_statistics, pending)):
+            results[repository.name] = contributions
+        pending = [repository for repository in pending if results[repository.name] is None]
+        delay *= 2
+
+    return results, [repository.name for repository in pending]
+
+
+@instrumentation.timed
+def fetch_contributor_store(repositories_list):
+    """
+    Returns the weekly contributor statistics store, kept in CONTRIBUTOR_STORE_PATH when set, with the
+    repositories not synchronised for CONTRIBUTOR_STATS_TTL seconds fetched again.
+    """
+    store = run_cache.get('contributor_store')
+    if store is None:
+        store = run_cache['contributor_store'] = ContributorStore(config.get().contributor_store_path or ':memory:')
 
+    stale = [repository for repository in repositories_list if not store.is_fresh(repository.name)]
+    if stale:
+        results, unresolved = fetch_all_contributor_statistics(stale)
+        if unresolved:
+            sys.stderr.write('Contributor statistics still being computed for: {0}\n'.format(', '.join(unresolved)))
 
-def fetch_contributor_statistics(repositories_list):
-    statistics = {}
-    e_tag = None
-    last_status = 0
-    contributions = None
+        for name, contributions in results.items():
+            if contributions is not None:
+                store.save(name, contributions)
+    return store
 
-    for repository in repositories_list:
-        contributions = repository.contributor_statistics()
-
-        # for contrib in contributions:
-        while True:
-            try:
-                contrib = next(contributions, None)
-
-                # while contributions.last_status == 202:
-                #   print('Waiting After Iterator')
-
-                if contrib is None:
-                    break
-
-                if ((len(IGNORE_USERS) == 0 or contrib.author.login.lower() not in IGNORE_USERS)
-                        and (len(USER_NAMES) == 0 or contrib.author.login.lower() in USER_NAMES)):
-                    c = get_last_statistics(
-                        contrib.weeks[len(contrib.weeks) - int(TIME_EVALUATED): len(contrib.weeks)], 'c')
-                    a = get_last_statistics(
-                        contrib.weeks[len(contrib.weeks) - int(TIME_EVALUATED): len(contrib.weeks)], 'a')
-                    d = get_last_statistics(
-                        contrib.weeks[len(contrib.weeks) - int(TIME_EVALUATED): len(contrib.weeks)], 'd')
-
-                    if contrib.author.login not in statistics:
-                        statistics[contrib.author.login] = {
-                            'commits': 0,
-                            'additions': 0,
-                            'deletions': 0
-                        }
-
-                    statistics[contrib.author.login]['commits'] += c
-                    statistics[contrib.author.login]['additions'] += a
-                    statistics[contrib.author.login]['deletions'] += d
-            except UnprocessableResponseBody:
-                print('Error 202')
-                time.sleep(1)
-    return statistics
+
+def fetch_contributor_statistics(repositories_list, weeks=None, offset=0, store=None):
+    """
+    Returns the commits, additions and deletions per selected user over the last weeks weeks, TIME_EVALUATED
+    by default, or over the weeks weeks ending offset weeks earlier.
+    Reads store when given, so that a report reading several windows synchronises the statistics once.
+    """
+    weeks = weeks or config.get().time_evaluated
+    if store is None:
+        store = fetch_contributor_store(repositories_list)
+    totals = store.totals([repository.name for repository in repositories_list], weeks, offset)
+
+    return {login: statistics for login, statistics in totals.items()
+            if not filters.is_ignored_user(login) and filters.is_listed_user(login)}
 
 
 def as_label(pull, text):
     for label in pull.labels:
-        if str(label['name']).upper() == text:
+        if str(label).upper() == text:
             return True
     return False
 
 
 def count_pull_request_reviews(pull_request):
     reviews = {}
-    author = pull_request.user.login
-    pr_reviews = pull_request.reviews()
+    author = pull_request.author.login
 
-    for r in pr_reviews:
+    for r in pull_request.reviews:
         if r.user.login != author:
             if r.user.login in reviews:
                 if r.state != 'COMMENTED':
@@ -259,52 +424,345 @@ def count_pull_request_reviews(pull_request):
     return result
 
 
-def fetch_user_reviews_count(pull_request):
-    reviews = {}
+def window_start(days):
+    """
+    Returns the start of the window of the last days days, from midnight UTC as the created:>= qualifier of
+    a search, so that walking and searching cover the same pull requests.
+    """
+    today = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(-days)
 
-    for p in pull_request:
-        for r in p.reviews():
-            if not IGNORE_USERS or r.user.login.lower() not in IGNORE_USERS:
-                reviews[r.user.login] = {'reviews': reviews[r.user.login]['reviews'] + 1} \
-                    if r.user.login in reviews and 'reviews' in reviews[r.user.login] \
-                    else {'reviews': 1}
 
-    return reviews
+def window_starts(windows):
+    return {days: window_start(days) for days in windows}
 
 
-def fetch_users_without_reviews(repositories_list):
-    reviews = {}
+@instrumentation.timed
+def fetch_window_reviews_count(pull_requests, windows, logins):
+    """
+    Returns the number of pull requests each of logins reviewed and the number of pull requests of every
+    window, in days, bucketing the pull requests by creation date in one pass. Several reviews of the same
+    pull request count once, as with a reviewed-by search.
+    """
+    logins = set(logins)
+    starts = window_starts(windows)
+    reviews = {days: defaultdict(lambda: {'reviews': 0}) for days in windows}
+    pr_counts = dict.fromkeys(windows, 0)
+
+    for p in pull_requests:
+        reviewers = {r.user.login for r in p.reviews
+                     if r.user.login in logins and not filters.is_ignored_user(r.user.login)}
+        for days in [days for days in windows if p.created_at >= starts[days]]:
+            pr_counts[days] += 1
+            for login in reviewers:
+                reviews[days][login]['reviews'] += 1
+
+    return {days: (dict(reviews[days]), pr_counts[days]) for days in windows}
+
 
+def search_queries(qualifiers, repositories_list):
+    """
+    Returns the search queries covering the repositories with the given qualifiers, as many
+    repo: qualifiers per query as the query length allows.
+    """
+    queries = []
+    query = qualifiers
     for repository in repositories_list:
-        users = repository.collaborators()
-        for user in users:
-            if not IGNORE_USERS or user.login.lower() not in IGNORE_USERS:
-                reviews[user.login] = {
-                    'reviews': 0
-                }
+        qualifier = ' repo:{0}/{1}'.format(config.get().organization, repository.name)
+        if len(query) + len(qualifier) > SEARCH_QUERY_LIMIT and query != qualifiers:
+            queries.append(query)
+            query = qualifiers
+        query += qualifier
+    queries.append(query)
+    return queries
+
+
+def search_count(query):
+    response = get_client().session.get(get_client().session.build_url('search', 'issues'),
+                                        params={'q': query, 'per_page': 1})
+    response.raise_for_status()
+    return response.json()['total_count']
+
+
+def fetch_search_counts(queries):
+    settings = config.get()
+    if settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        return asynchronous.fetch_search_counts(settings.github_api_token, settings.organization, queries)
+    return parallel_map(search_count, queries)
 
-    return reviews
 
+def search_window_qualifiers(days=None):
+    settings = config.get()
+    start = window_start(days or settings.time_evaluated)
+    return 'is:pr org:{0} created:>={1}'.format(settings.organization, start.strftime('%Y-%m-%d'))
 
-def fetch_organization_raw_pulls(repositories_list):
+
+def fetch_pull_request_count_by_search(repositories_list, days=None):
+    return sum(fetch_search_counts(search_queries(search_window_qualifiers(days), repositories_list)))
+
+
+@instrumentation.timed
+def fetch_user_reviews_count_by_search(logins, repositories_list, days=None):
     """
-    Returns a raw list of pull request.
+    Returns the number of pull requests of the last days days each user reviewed, with one
+    reviewed-by search per user and chunk of repositories.
     """
-    lines = []
+    queries = {login: search_queries('{0} reviewed-by:{1}'.format(search_window_qualifiers(days), login),
+                                     repositories_list)
+               for login in logins if not filters.is_ignored_user(login)}
+    counts = iter(fetch_search_counts([query for user_queries in queries.values() for query in user_queries]))
 
-    for repository in repositories_list:
-        repos = fetch_repository_all_pulls(repository)
-        lines += repos
+    return {login: {'reviews': sum(next(counts) for _ in user_queries)} for login, user_queries in queries.items()}
+
+
+def choose_review_count_strategy(repositories_list, logins, windows):
+    """
+    Returns walk or search following REVIEW_COUNT_STRATEGY, and the pull request count of the widest
+    window when it was searched. In auto mode the calls of walking every pull request's reviews of the
+    widest window are estimated against one search per user, window and chunk of repositories.
+    """
+    settings = config.get()
+    if settings.review_count_strategy in ('walk', 'search'):
+        return settings.review_count_strategy, None
+
+    key = ('raw_pulls', max(windows)) + tuple(repository.name for repository in repositories_list)
+    if settings.pr_store_path or (key in run_cache and run_cache[key][1]):
+        # The reviews are already known locally, walking them costs next to nothing.
+        return 'walk', None
+
+    chunks = len(search_queries(search_window_qualifiers(max(windows)), repositories_list))
+    pr_count = fetch_pull_request_count_by_search(repositories_list, max(windows))
+    walk_calls = len(repositories_list) + pr_count // 100 + pr_count
+    search_calls = (len(logins) + 1) * chunks * len(windows)
+    return ('search' if search_calls < walk_calls else 'walk'), pr_count
+
+
+def fetch_reviews_count(repositories_list, logins, windows=None):
+    """
+    Returns the number of pull requests each of logins reviewed and the number of pull requests of every
+    window, in days, by walking the reviews of every pull request of the widest window once or with one
+    search per user and window. Both strategies count the same thing, so the choice only changes the cost.
+    """
+    windows = windows or (config.get().time_evaluated,)
+    strategy, pr_count = choose_review_count_strategy(repositories_list, logins, windows)
+    instrumentation.note('review_count_search', int(strategy == 'search'))
+
+    if strategy == 'search':
+        counts = {}
+        for days in windows:
+            if pr_count is None or days != max(windows):
+                window_pr_count = fetch_pull_request_count_by_search(repositories_list, days)
+            else:
+                window_pr_count = pr_count
+            counts[days] = (fetch_user_reviews_count_by_search(sorted(logins), repositories_list, days),
+                            window_pr_count)
+        return counts
+
+    return fetch_window_reviews_count(fetch_organization_raw_pulls(repositories_list, days=max(windows)), windows,
+                                      logins)
+
+
+def list_logins(path):
+    """
+    Returns the logins of a paginated user listing of the REST API, or None when the token may not read it.
+    """
+    session = get_client().session
+    url = session.build_url(*path.strip('/').split('/'))
+    params = {'per_page': 100}
+    logins = []
+
+    # The next page URLs already carry the parameters.
+    while url:
+        response = session.get(url, params=params)
+        if response.status_code in (403, 404):
+            return None
+        response.raise_for_status()
+        logins += [user['login'] for user in response.json()]
+        url = response.links.get('next', {}).get('url')
+        params = None
+    return logins
+
+
+def fetch_organization_roster():
+    """
+    Returns the logins of the ORGANIZATION members, or of the ROSTER_TEAMS members, and of its outside
+    collaborators, None when they cannot be listed. Cached in ORG_ROSTER_PATH for ORG_ROSTER_TTL seconds,
+    unless the members could not be listed.
+    """
+    settings = config.get()
+    if 'roster' in run_cache:
+        return run_cache['roster']
+
+    roster = ttl_cache.load(settings.org_roster_path, settings.org_roster_ttl) if settings.org_roster_path else None
+    if roster is None:
+        paths = (['/orgs/{0}/teams/{1}/members'.format(settings.organization, team) for team in settings.roster_teams]
+                 or ['/orgs/{0}/members'.format(settings.organization)])
+        paths.append('/orgs/{0}/outside_collaborators'.format(settings.organization))
+
+        if settings.github_backend == 'async':
+            import controllers.github_async_controller as asynchronous
+            listings = asynchronous.fetch_user_logins(settings.github_api_token, settings.organization, paths)
+        else:
+            listings = parallel_map(list_logins, paths)
+
+        unlisted = [path for path, logins in zip(paths, listings[:-1]) if logins is None]
+        if unlisted:
+            sys.stderr.write('Could not list {0}, the repository collaborators are listed instead\n'.format(
+                ', '.join(unlisted)))
+
+        roster = {
+            'members': None if unlisted else sorted({login for logins in listings[:-1] for login in logins}),
+            'outside_collaborators': listings[-1]
+        }
+        if settings.org_roster_path and not unlisted:
+            ttl_cache.save(settings.org_roster_path, roster)
 
-    return lines
+    run_cache['roster'] = roster
+    return roster
 
 
-def fetch_users_pr_author(pull_request_list):
-    authors = {}
+@instrumentation.timed
+def fetch_users_without_reviews(repositories_list):
+    """
+    Returns every user of the organization roster with no review, plus the outside collaborators of the
+    repositories. Repositories are only listed when the organization has outside collaborators, or when
+    the token may not list them. When the members cannot be listed, every collaborator of the repositories
+    is listed instead.
+    """
+    settings = config.get()
+    roster = fetch_organization_roster()
+    logins = set(roster['members'] or [])
+    affiliation = 'all' if roster['members'] is None else 'outside'
+
+    if roster['members'] is None or roster['outside_collaborators'] is None or roster['outside_collaborators']:
+        if settings.github_backend == 'async':
+            import controllers.github_async_controller as asynchronous
+            repositories_users = asynchronous.fetch_collaborators(
+                settings.github_api_token, settings.organization,
+                [repository.name for repository in repositories_list], affiliation)
+        else:
+            repositories_users = parallel_map(
+                lambda repository: list(repository.collaborators(affiliation=affiliation)), repositories_list)
+
+        for users in repositories_users:
+            logins.update(user.login for user in users)
+
+    return {login: {'reviews': 0} for login in sorted(logins) if not filters.is_ignored_user(login)}
+
+
+def fetch_repository_updated_pulls(repository, since):
+    """
+    Returns records of the pull requests of a repository updated after since, with their reviews.
+    """
+    pulls = []
+
+    for pull in repository.pull_requests(state='all', sort='updated', direction='desc'):
+        if pull.updated_at <= since:
+            break
+        pulls.append(records.from_github3(pull, repository.name, pull.reviews()))
+    return pulls
+
+
+def fetch_repository_created_pulls(repository, since, until):
+    """
+    Returns records of the pull requests of a repository created from since to before until, with their reviews.
+    """
+    pulls = []
+
+    for pull in repository.pull_requests(state='all', sort='created', direction='desc'):
+        if pull.created_at < since:
+            break
+        if pull.created_at < until:
+            pulls.append(records.from_github3(pull, repository.name, pull.reviews()))
+    return pulls
+
+
+def sync_pull_request_store(store, repositories_list, window_start):
+    """
+    Brings the store up to date, fetching only the pull requests updated since the last synchronisation,
+    or since window_start for repositories synchronised for the first time. When window_start is older
+    than the window the store covers, the pull requests created in between are fetched as well.
+    """
+    settings = config.get()
+    names = [repository.name for repository in repositories_list]
+    states = [store.sync_state(name) for name in names]
+    marks = [high_water or window_start for high_water, _ in states]
+    # The pull requests created before the covered window were never fetched, whatever their update date.
+    gaps = [(repository, (window_start, covered)) for repository, (_, covered) in zip(repositories_list, states)
+            if covered is not None and window_start < covered]
+
+    if settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        updated = asynchronous.fetch_updated_pulls(settings.github_api_token, settings.organization, names, marks)
+        backfilled = asynchronous.fetch_created_pulls(settings.github_api_token, settings.organization,
+                                                      [repository.name for repository, _ in gaps],
+                                                      [window for _, window in gaps]) if gaps else []
+    else:
+        updated = parallel_map(lambda item: fetch_repository_updated_pulls(*item),
+                               list(zip(repositories_list, marks)))
+        backfilled = parallel_map(lambda gap: fetch_repository_created_pulls(gap[0], *gap[1]), gaps)
+
+    for name, pulls in zip(names, updated):
+        store.save(name, pulls, window_start)
+    for (repository, _), pulls in zip(gaps, backfilled):
+        store.save(repository.name, pulls, window_start)
+
+
+@instrumentation.timed
+def fetch_organization_raw_pulls(repositories_list, with_reviews=True, days=None):
+    """
+    Returns records of the pull requests created in the last days days, TIME_EVALUATED by default, with
+    their reviews unless with_reviews is False.
+    With PR_STORE_PATH set the pull requests and their reviews are read from the local store.
+    """
+    settings = config.get()
+    days = days or settings.time_evaluated
+    key = ('raw_pulls', days) + tuple(repository.name for repository in repositories_list)
+    if key in run_cache and (run_cache[key][1] or not with_reviews):
+        return list(run_cache[key][0])
+
+    start = window_start(days)
+
+    if settings.pr_store_path:
+        store = PullRequestStore(settings.pr_store_path)
+        sync_pull_request_store(store, repositories_list, start)
+        lines = store.pulls_created_since([repository.name for repository in repositories_list], start)
+        with_reviews = True
+    elif settings.github_backend == 'async':
+        import controllers.github_async_controller as asynchronous
+        lines = []
+
+        for repos in asynchronous.fetch_window_pulls(
+                settings.github_api_token, settings.organization, [repository.name for repository in repositories_list],
+                start, settings.max_pr_to_check, with_reviews):
+            lines += repos
+    else:
+        unchecked_pulls = []
+
+        for repository, repos in zip(repositories_list,
+                                     parallel_map(lambda repository: fetch_repository_all_pulls(repository, start),
+                                                  repositories_list)):
+            unchecked_pulls += [(pull, repository.name) for pull in repos]
+
+        lines = parallel_map(lambda item: records.from_github3(item[0], item[1],
+                                                               item[0].reviews() if with_reviews else None),
+                             unchecked_pulls)
+
+    run_cache[key] = (lines, with_reviews)
+    return list(lines)
+
+
+@instrumentation.timed
+def fetch_window_pr_authors(pull_request_list, windows):
+    """
+    Returns the pull request count per author of every window, in days, in one pass over the pull requests.
+    """
+    starts = window_starts(windows)
+    authors = {days: defaultdict(lambda: {'pr_count': 0}) for days in windows}
+
     for pr in pull_request_list:
-        if pr.user.login not in authors:
-            authors[pr.user.login] = {
-                'pr_count': 0
-            }
-        authors[pr.user.login]['pr_count'] += 1
-    return authors
+        for days in windows:
+            if pr.created_at >= starts[days]:
+                authors[days][pr.author.login]['pr_count'] += 1
+    return {days: dict(authors[days]) for days in windows}
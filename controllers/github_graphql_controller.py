@@ -0,0 +1,222 @@
+import threading
+from datetime import datetime, timezone
+import requests
+import controllers.config as config
+import controllers.rate_limit as rate_limit
+import controllers.replay as replay
+import controllers.instrumentation as instrumentation
+from controllers.records import PullRequestRecord, ReviewRecord, UserRecord, GHOST_URL
+
+REPOSITORIES_PAGE_SIZE = 25
+PULLS_PAGE_SIZE = 50
+CONNECTION_PAGE_SIZE = 100
+
+# Connections of a pull request, with the fields of their nodes. Pages past the first are fetched per pull request.
+CONNECTIONS = {
+    'labels': 'name',
+    'reviews': 'state author { login url }',
+    'reviewRequests': 'requestedReviewer { ... on User { login url } }'
+}
+
+PULL_FIELDS = '''
+fragment PullFields on PullRequest {
+  number
+  title
+  url
+  createdAt
+  updatedAt
+  author { login url }
+  labels(first: 20) { pageInfo { hasNextPage endCursor } nodes { %(labels)s } }
+  reviews(first: 100) { pageInfo { hasNextPage endCursor } nodes { %(reviews)s } }
+  reviewRequests(first: 20) { pageInfo { hasNextPage endCursor } nodes { %(reviewRequests)s } }
+}
+''' % CONNECTIONS
+
+# Newest first, as the REST listing of open pull requests.
+PULLS_ORDER = 'orderBy: {field: CREATED_AT, direction: DESC}'
+
+ORGANIZATION_QUERY = '''
+query($organization: String!, $cursor: String) {
+  organization(login: $organization) {
+    repositories(first: %d, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        pullRequests(states: OPEN, first: %d, %s) {
+          pageInfo { hasNextPage endCursor }
+          nodes { ...PullFields }
+        }
+      }
+    }
+  }
+}
+''' % (REPOSITORIES_PAGE_SIZE, PULLS_PAGE_SIZE, PULLS_ORDER) + PULL_FIELDS
+
+REPOSITORY_PULLS_QUERY = '''
+query($organization: String!, $name: String!, $cursor: String) {
+  repository(owner: $organization, name: $name) {
+    pullRequests(states: OPEN, first: %d, after: $cursor, %s) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...PullFields }
+    }
+  }
+}
+''' % (PULLS_PAGE_SIZE, PULLS_ORDER) + PULL_FIELDS
+
+CONNECTION_QUERY = '''
+query($organization: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $organization, name: $name) {
+    pullRequest(number: $number) {
+      %s(first: %d, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { %s }
+      }
+    }
+  }
+}
+'''
+
+session = None
+session_lock = threading.Lock()
+
+
+class GraphQLError(Exception):
+    """
+    Errors answered by the GraphQL API, with their types in types, NOT_FOUND for a missing repository for example.
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors[0].get('message'))
+        self.types = {error.get('type') for error in errors}
+
+
+class GraphQLRepository:
+    """
+    Repository as returned by the GraphQL backend, with records of its open pull requests already fetched.
+    """
+
+    def __init__(self, name, pulls):
+        self.name = name
+        self.pulls = pulls
+
+
+def get_session():
+    """
+    Returns the HTTP session of the GraphQL queries, created on the first query.
+    """
+    global session
+
+    with session_lock:
+        if session is None:
+            session = instrumentation.install(replay.install(rate_limit.install(requests.Session())))
+    return session
+
+
+def run_query(token, query, variables):
+    response = get_session().post(config.get().github_graphql_url, json={'query': query, 'variables': variables},
+                                  headers={'Authorization': 'bearer {0}'.format(token)})
+    response.raise_for_status()
+    answer = response.json()
+    if answer.get('errors'):
+        raise GraphQLError(answer['errors'])
+    return answer['data']
+
+
+def to_user(node):
+    if node is None:
+        return UserRecord('ghost', GHOST_URL)
+    return UserRecord(node['login'], node['url'])
+
+
+def to_pull(node, repository):
+    requested_reviewers = tuple(to_user(request['requestedReviewer'])
+                                for request in node['reviewRequests']['nodes']
+                                if request['requestedReviewer'] and 'login' in request['requestedReviewer'])
+    created_at = datetime.strptime(node['createdAt'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+    return PullRequestRecord(
+        repository=repository,
+        number=node['number'],
+        title=node['title'],
+        html_url=node['url'],
+        state='open',
+        author=to_user(node['author']),
+        created_at=created_at,
+        updated_at=datetime.strptime(node['updatedAt'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc),
+        labels=tuple(label['name'] for label in node['labels']['nodes']),
+        reviews=tuple(ReviewRecord(to_user(review['author']), review['state']) for review in node['reviews']['nodes']),
+        requested_reviewers=requested_reviewers
+    )
+
+
+def fetch_remaining_pulls(token, organization, name, page_info):
+    nodes = []
+
+    while page_info['hasNextPage']:
+        data = run_query(token, REPOSITORY_PULLS_QUERY,
+                         {'organization': organization, 'name': name, 'cursor': page_info['endCursor']})
+        pull_requests = data['repository']['pullRequests']
+        nodes += pull_requests['nodes']
+        page_info = pull_requests['pageInfo']
+
+    return nodes
+
+
+def fetch_remaining_connection(token, organization, name, node, connection):
+    """
+    Adds the nodes past the first page of a connection of a pull request node, labels or reviews for example.
+    """
+    query = CONNECTION_QUERY % (connection, CONNECTION_PAGE_SIZE, CONNECTIONS[connection])
+    page_info = node[connection]['pageInfo']
+
+    while page_info['hasNextPage']:
+        data = run_query(token, query, {'organization': organization, 'name': name, 'number': node['number'],
+                                        'cursor': page_info['endCursor']})
+        page = data['repository']['pullRequest'][connection]
+        node[connection]['nodes'] += page['nodes']
+        page_info = page['pageInfo']
+
+
+def fetch_repository(token, organization, name, pull_requests=None):
+    """
+    Returns the repository with every open pull request, reviews, labels and requested reviewers, or None when
+    it does not exist. pull_requests is the first page of its pull requests, when fetched with the repository.
+    """
+    try:
+        if pull_requests is None:
+            pull_nodes = fetch_remaining_pulls(token, organization, name, {'hasNextPage': True, 'endCursor': None})
+        else:
+            pull_nodes = pull_requests['nodes'] + fetch_remaining_pulls(token, organization, name,
+                                                                        pull_requests['pageInfo'])
+    except GraphQLError as error:
+        if 'NOT_FOUND' in error.types:
+            return None
+        raise
+
+    for pull_node in pull_nodes:
+        for connection in CONNECTIONS:
+            fetch_remaining_connection(token, organization, name, pull_node, connection)
+    return GraphQLRepository(name, [to_pull(pull, name) for pull in pull_nodes])
+
+
+def fetch_organization_repositories(token, organization, is_selected):
+    """
+    Returns the repositories of the organization kept by is_selected(name) together with their open pull requests,
+    reviews, labels and requested reviewers. The pages past the first are only fetched for the kept repositories.
+    """
+    repos = []
+    cursor = None
+
+    while True:
+        data = run_query(token, ORGANIZATION_QUERY, {'organization': organization, 'cursor': cursor})
+        repositories = data['organization']['repositories']
+
+        for node in repositories['nodes']:
+            if is_selected(node['name']):
+                repos.append(fetch_repository(token, organization, node['name'], node['pullRequests']))
+
+        if not repositories['pageInfo']['hasNextPage']:
+            break
+        cursor = repositories['pageInfo']['endCursor']
+
+    return repos
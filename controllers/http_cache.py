@@ -0,0 +1,122 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+import controllers.config as config
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter keeping GET responses on disk and revalidating them with ETag / Last-Modified.
+    A 304 answer is served from the cache, the least recently used entries are evicted past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self.entries())
+
+    def entries(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')]
+
+    def path_for(self, request):
+        key = '{0} {1}'.format(request.url, request.headers.get('Accept', ''))
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        path = self.path_for(request)
+        entry = self.load(path)
+        if entry is not None:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            os.utime(path)
+            return self.build_response_from_cache(request, entry, response)
+
+        if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            self.store(path, response)
+
+        return response
+
+    def load(self, path):
+        try:
+            with open(path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, path, response):
+        entry = {
+            'url': response.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'content': base64.b64encode(response.content).decode('ascii')
+        }
+        data = json.dumps(entry)
+
+        with self.lock:
+            if os.path.exists(path):
+                self.size -= os.path.getsize(path)
+            with open(path, 'w') as cache_file:
+                cache_file.write(data)
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        entries = sorted(self.entries(), key=os.path.getmtime)
+        while entries and self.size > self.max_bytes:
+            path = entries.pop(0)
+            self.size -= os.path.getsize(path)
+            os.remove(path)
+
+    def build_response_from_cache(self, request, entry, not_modified):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # Keep the rate limit headers of the live answer, they describe the current budget.
+        for header, value in not_modified.headers.items():
+            if header.lower().startswith('x-ratelimit'):
+                response.headers[header] = value
+        response.encoding = entry['encoding']
+        response._content = base64.b64decode(entry['content'])
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        not_modified.close()
+        return response
+
+
+def install(session, pool_maxsize=10):
+    """
+    Mounts a keep-alive adapter with pool_maxsize connections on a requests session, caching on disk
+    when HTTP_CACHE_DIR is set.
+    """
+    settings = config.get()
+    if settings.http_cache_dir:
+        adapter = CachingAdapter(os.path.expanduser(settings.http_cache_dir), settings.http_cache_max_mb * 1024 * 1024,
+                                 pool_maxsize=pool_maxsize)
+    else:
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,160 @@
+import re
+import json
+import time
+import atexit
+import inspect
+import functools
+import threading
+from collections import defaultdict
+import controllers.config as config
+import controllers.rate_limit as rate_limit
+
+METRICS_PREFIX = 'pull_request_reminder'
+
+NUMBER = re.compile(r'/\d+(?=/|$)')
+REPOSITORY = re.compile(r'^/repos/[^/]+/[^/]+')
+OWNER = re.compile(r'^/(orgs|users)/[^/]+')
+
+lock = threading.Lock()
+started_at = time.time()
+stages = defaultdict(lambda: {'seconds': 0.0, 'calls': 0})
+http = defaultdict(lambda: {'requests': 0, 'bytes': 0, 'cache_hits': 0})
+values = {}
+
+
+def endpoint(method, url):
+    """
+    Returns the method and path template of a URL, e.g. GET /repos/:owner/:repo/pulls/:number/reviews.
+    """
+    path = re.sub(r'^https?://[^/]+', '', url.split('?')[0])
+    path = OWNER.sub(r'/\1/:name', REPOSITORY.sub('/repos/:owner/:repo', NUMBER.sub('/:number', path)))
+    return '{0} {1}'.format(method, path)
+
+
+def add_stage(name, seconds):
+    with lock:
+        stages[name]['seconds'] += seconds
+        stages[name]['calls'] += 1
+
+
+def timed(function):
+    """
+    Records the wall time of every call of function as a stage named after it.
+    For generator functions only the time spent producing items is counted.
+    """
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def generator_wrapper(*args, **kwargs):
+            generator = function(*args, **kwargs)
+            seconds = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    finally:
+                        seconds += time.perf_counter() - start
+                    yield item
+            except StopIteration:
+                return
+            finally:
+                add_stage(function.__name__, seconds)
+
+        return generator_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            add_stage(function.__name__, time.perf_counter() - start)
+
+    return wrapper
+
+
+def record_response(method, url, size, from_cache=False):
+    with lock:
+        metrics = http[endpoint(method, url)]
+        metrics['requests'] += 1
+        metrics['bytes'] += size
+        metrics['cache_hits'] += 1 if from_cache else 0
+
+
+def note(name, value):
+    """
+    Adds a named value of the run, such as the number of pull requests evaluated, to the report.
+    """
+    with lock:
+        values[name] = value
+
+
+def install(session):
+    """
+    Counts the requests of a requests session per endpoint, with their size and cache hits.
+    """
+    def hook(response, *args, **kwargs):
+        record_response(response.request.method, response.request.url,
+                        len(response.content or b''), getattr(response, 'from_cache', False))
+
+    session.hooks['response'].append(hook)
+    return session
+
+
+def report():
+    with lock:
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(started_at)),
+            'wall_seconds': round(time.time() - started_at, 3),
+            'stages': {name: dict(stage, seconds=round(stage['seconds'], 3)) for name, stage in stages.items()},
+            'http': dict(http),
+            'rate_limit': rate_limit.gate.counters(),
+            'values': dict(values)
+        }
+
+
+def prometheus(data):
+    lines = ['# TYPE {0}_run_seconds gauge'.format(METRICS_PREFIX),
+             '{0}_run_seconds {1}'.format(METRICS_PREFIX, data['wall_seconds'])]
+
+    for metric, field, kind in (('stage_seconds', 'seconds', 'gauge'), ('stage_calls', 'calls', 'gauge')):
+        lines.append('# TYPE {0}_{1} {2}'.format(METRICS_PREFIX, metric, kind))
+        lines += ['{0}_{1}{{stage="{2}"}} {3}'.format(METRICS_PREFIX, metric, name, stage[field])
+                  for name, stage in sorted(data['stages'].items())]
+
+    for metric, field in (('http_requests', 'requests'), ('http_bytes', 'bytes'), ('http_cache_hits', 'cache_hits')):
+        lines.append('# TYPE {0}_{1} gauge'.format(METRICS_PREFIX, metric))
+        lines += ['{0}_{1}{{endpoint="{2}"}} {3}'.format(METRICS_PREFIX, metric, name, metrics[field])
+                  for name, metrics in sorted(data['http'].items())]
+
+    for name, value in sorted(data['rate_limit'].items()):
+        if value is not None:
+            lines.append('# TYPE {0}_rate_limit_{1} gauge'.format(METRICS_PREFIX, name))
+            lines.append('{0}_rate_limit_{1} {2}'.format(METRICS_PREFIX, name, value))
+
+    for name, value in sorted(data['values'].items()):
+        lines.append('# TYPE {0}_{1} gauge'.format(METRICS_PREFIX, name))
+        lines.append('{0}_{1} {2}'.format(METRICS_PREFIX, name, value))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_report():
+    """
+    Writes the run report as JSON to RUN_REPORT_FILE and as Prometheus text to METRICS_FILE, when set.
+    Nothing is written when no report loaded the settings.
+    """
+    settings = config.current
+    if settings is None or not (settings.run_report_file or settings.metrics_file):
+        return
+
+    data = report()
+    if settings.run_report_file:
+        with open(settings.run_report_file, 'w') as report_file:
+            json.dump(data, report_file, indent=2)
+    if settings.metrics_file:
+        with open(settings.metrics_file, 'w') as metrics_file:
+            metrics_file.write(prometheus(data))
+
+
+atexit.register(write_report)
@@ -0,0 +1,112 @@
+import os
+import json
+import sqlite3
+from datetime import datetime
+from controllers.records import PullRequestRecord, ReviewRecord, UserRecord
+
+SCHEMA_VERSION = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pulls (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    html_url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    author TEXT NOT NULL,
+    author_url TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    PRIMARY KEY (repository, number)
+);
+CREATE INDEX IF NOT EXISTS pulls_created_at ON pulls (created_at);
+CREATE TABLE IF NOT EXISTS reviews (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    author TEXT NOT NULL,
+    author_url TEXT NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_pull ON reviews (repository, number);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repository TEXT PRIMARY KEY,
+    high_water TEXT,
+    covered_from TEXT
+);
+'''
+
+
+class PullRequestStore:
+    """
+    SQLite store of pull requests and their reviews, synchronised per repository from a high-water mark
+    on updated_at. covered_from is the oldest creation date from which every pull request is stored.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(os.path.expanduser(path))
+        # Older layouts are dropped, the next synchronisation fills the store again.
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript('DROP TABLE IF EXISTS pulls; DROP TABLE IF EXISTS reviews; '
+                                          'DROP TABLE IF EXISTS sync_state; '
+                                          'PRAGMA user_version = {0};'.format(SCHEMA_VERSION))
+        self.connection.executescript(SCHEMA)
+
+    def sync_state(self, repository):
+        """
+        Returns the high-water mark and the start of the covered window of a repository, None when never synchronised.
+        """
+        row = self.connection.execute('SELECT high_water, covered_from FROM sync_state WHERE repository = ?',
+                                      (repository,)).fetchone()
+        return tuple(datetime.fromisoformat(value) if value else None for value in row or (None, None))
+
+    def save(self, repository, pulls, covered_from=None):
+        """
+        Saves pull request records of a repository, with their reviews, moves its high-water mark to the
+        newest updated_at and extends the covered window back to covered_from.
+        """
+        with self.connection:
+            for pull in pulls:
+                self.connection.execute('INSERT OR REPLACE INTO pulls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        (repository, pull.number, pull.title, pull.html_url, pull.state,
+                                         pull.author.login, pull.author.html_url, pull.created_at.isoformat(),
+                                         pull.updated_at.isoformat(), json.dumps(pull.labels)))
+                self.connection.execute('DELETE FROM reviews WHERE repository = ? AND number = ?',
+                                        (repository, pull.number))
+                self.connection.executemany('INSERT INTO reviews VALUES (?, ?, ?, ?, ?)',
+                                            [(repository, pull.number, review.user.login, review.user.html_url,
+                                              review.state)
+                                             for review in pull.reviews or ()])
+
+            high_water, covered = self.sync_state(repository)
+            high_water = max([mark for mark in [high_water] + [pull.updated_at for pull in pulls] if mark],
+                             default=None)
+            covered = min([mark for mark in (covered, covered_from) if mark], default=None)
+            self.connection.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)',
+                                    (repository, high_water and high_water.isoformat(),
+                                     covered and covered.isoformat()))
+
+    def pulls_created_since(self, repositories, since):
+        """
+        Returns records of the stored pull requests of the given repositories created at or after since.
+        """
+        marks = ', '.join('?' * len(repositories))
+        arguments = list(repositories) + [since.replace(microsecond=0).isoformat()]
+
+        reviews = {}
+        for repository, number, author, author_url, state in self.connection.execute(
+                'SELECT r.repository, r.number, r.author, r.author_url, r.state FROM reviews r '
+                'JOIN pulls p ON p.repository = r.repository AND p.number = r.number '
+                'WHERE p.repository IN ({0}) AND p.created_at >= ?'.format(marks), arguments):
+            reviews.setdefault((repository, number), []).append(ReviewRecord(UserRecord(author, author_url), state))
+
+        return [PullRequestRecord(repository=repository, number=number, title=title, html_url=html_url, state=state,
+                                  author=UserRecord(author, author_url),
+                                  created_at=datetime.fromisoformat(created_at),
+                                  updated_at=datetime.fromisoformat(updated_at),
+                                  labels=tuple(json.loads(labels)),
+                                  reviews=tuple(reviews.get((repository, number), [])))
+                for repository, number, title, html_url, state, author, author_url, created_at, updated_at, labels
+                in self.connection.execute(
+                    'SELECT * FROM pulls WHERE repository IN ({0}) AND created_at >= ? '
+                    'ORDER BY repository, number DESC'.format(marks), arguments)]
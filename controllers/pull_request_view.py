@@ -0,0 +1,128 @@
+import threading
+from dataclasses import replace
+import controllers.config as config
+import controllers.filters as filters
+import controllers.github_controller as github
+from controllers.records import ReviewRecord, from_rest, rest_user
+
+# Review states that a dismissal turns into DISMISSED.
+DISMISSIBLE_STATES = ('APPROVED', 'CHANGES_REQUESTED')
+
+
+class OpenPullRequestView:
+    """
+    In-memory records of the selected open pull requests, kept current by webhook payloads between full
+    resynchronizations.
+    """
+
+    def __init__(self):
+        self.pulls = {}
+        self.lock = threading.Lock()
+        # Bumped by each resync, so that an update computed from the previous records is computed again.
+        self.generation = 0
+        # Updates applied while a resync is fetching, kept over its records. None outside a resync.
+        self.changes = None
+
+    def resync(self):
+        """
+        Replaces the view with a full fetch of the open pull requests.
+        """
+        github.run_cache.clear()
+        with self.lock:
+            self.changes = {}
+        try:
+            repositories = github.fetch_organization_repositories(with_open_pulls=True)
+            pulls = {(pull.repository, pull.number): pull for pull in github.fetch_open_pull_records(repositories)}
+        except Exception:
+            with self.lock:
+                self.changes = None
+            raise
+
+        with self.lock:
+            for key, pull in self.changes.items():
+                if pull is None:
+                    pulls.pop(key, None)
+                else:
+                    pulls[key] = pull
+            self.pulls = pulls
+            self.changes = None
+            self.generation += 1
+
+    def records(self):
+        """
+        Returns the open pull requests in the order of a fetch: by repository name, newest first.
+        """
+        with self.lock:
+            pulls = list(self.pulls.values())
+        return sorted(pulls, key=lambda pull: (pull.repository.lower(), -pull.number))
+
+    def apply(self, event, payload):
+        """
+        Updates the view from a GitHub webhook payload. Returns False when the event was ignored.
+        """
+        if event not in ('pull_request', 'pull_request_review'):
+            return False
+        if (payload.get('organization') or {}).get('login', '').lower() != config.get().organization.lower():
+            return False
+
+        node = payload['pull_request']
+        key = (node['base']['repo']['name'], node['number'])
+        if not filters.is_selected_repository(key[0]):
+            return False
+
+        while True:
+            with self.lock:
+                known = self.pulls.get(key)
+                generation = self.generation
+
+            pull = updated(event, payload, key, known)
+            if pull is not None and not is_selected(pull):
+                pull = None
+
+            with self.lock:
+                # A resync replaced the records meanwhile, the update is computed again from its record.
+                if generation != self.generation:
+                    continue
+                if pull is None:
+                    self.pulls.pop(key, None)
+                else:
+                    self.pulls[key] = pull
+                if self.changes is not None:
+                    self.changes[key] = pull
+                return True
+
+
+def updated(event, payload, key, known):
+    """
+    Returns the record of the pull request of a webhook payload, None once it is closed. known is its current
+    record, None when the view does not hold it.
+    """
+    if event == 'pull_request':
+        if payload['action'] == 'closed':
+            return None
+        if known is not None or payload['action'] == 'opened':
+            return from_rest(payload['pull_request'], () if known is None else known.reviews)
+        return github.fetch_pull_request_record(*key)
+    if known is None:
+        return github.fetch_pull_request_record(*key)
+    return with_review(known, payload['action'], payload['review'])
+
+
+def is_selected(pull):
+    return github.is_open_pull_selected(pull) and filters.is_selected_repository(pull.repository)
+
+
+def with_review(pull, action, review):
+    """
+    Returns pull with a submitted review added, or with the reviews of a dismissed review's author dismissed.
+    Webhook review states are lower case, REST ones upper case.
+    """
+    user = rest_user(review['user'])
+
+    if action == 'submitted':
+        return replace(pull, reviews=pull.reviews + (ReviewRecord(user, review['state'].upper()),))
+    if action == 'dismissed':
+        return replace(pull, reviews=tuple(ReviewRecord(r.user, 'DISMISSED')
+                                           if r.user.login == user.login and r.state in DISMISSIBLE_STATES else r
+                                           for r in pull.reviews))
+    return pull
@@ -0,0 +1,128 @@
+import time
+import threading
+import controllers.config as config
+
+
+class RateLimitGate:
+    """
+    Tracks the GitHub rate limit budgets from the response headers and makes callers wait before spending them.
+    Below RATE_LIMIT_PACE_BELOW remaining calls the requests are spread until the reset, at
+    RATE_LIMIT_RESERVE they pause until the reset. Secondary limits pause for their Retry-After.
+    Each resource (core, search, graphql) has its own budget and pause, its thresholds are capped for small limits.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.budgets = {}
+        self.paused_until = {}
+        self.calls = 0
+        self.saved = 0
+        self.retries = 0
+        self.throttled = 0.0
+
+    def wait(self, resource='core'):
+        delay = self.reserve(resource)
+        if delay > 0:
+            time.sleep(delay)
+
+    def reserve(self, resource='core'):
+        """
+        Returns how long the caller has to wait before its next request, counting it as throttled time.
+        """
+        settings = config.get()
+        with self.lock:
+            now = time.time()
+            delay = 0
+            budget = self.budgets.get(resource)
+            if self.paused_until.get(resource, 0) > now:
+                delay = self.paused_until[resource] - now
+            elif budget is not None and budget['reset_at'] > now:
+                reserve = min(settings.rate_limit_reserve, budget['limit'] // 10)
+                if budget['remaining'] <= reserve:
+                    delay = budget['reset_at'] - now + 1
+                elif budget['remaining'] <= min(settings.rate_limit_pace_below, budget['limit'] // 2):
+                    delay = (budget['reset_at'] - now) / (budget['remaining'] - reserve)
+            self.throttled += delay
+            return delay
+
+    def update(self, response, resource='core'):
+        """
+        Records a response to a request counted against resource and returns True when it was refused by a rate
+        limit and should be retried.
+        """
+        with self.lock:
+            self.calls += 1
+            if getattr(response, 'from_cache', False):
+                self.saved += 1
+
+            headers = response.headers
+            resource = headers.get('X-RateLimit-Resource', resource)
+            budget = None
+            if 'X-RateLimit-Remaining' in headers and 'X-RateLimit-Reset' in headers:
+                remaining = int(headers['X-RateLimit-Remaining'])
+                budget = self.budgets[resource] = {
+                    'remaining': remaining,
+                    'reset_at': int(headers['X-RateLimit-Reset']),
+                    'limit': int(headers.get('X-RateLimit-Limit', remaining))
+                }
+
+            if response.status_code not in (403, 429):
+                return False
+
+            if 'Retry-After' in headers:
+                self.paused_until[resource] = time.time() + int(headers['Retry-After'])
+                return True
+            if budget is not None and budget['remaining'] == 0:
+                self.paused_until[resource] = budget['reset_at'] + 1
+                return True
+            return False
+
+    def counters(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'calls_saved': self.saved,
+                'retries': self.retries,
+                'throttled_seconds': round(self.throttled, 3),
+                'remaining': self.budgets.get('core', {}).get('remaining')
+            }
+
+
+gate = RateLimitGate()
+
+
+def resource(url):
+    """
+    Returns the rate limit resource a GitHub API URL is counted against.
+    """
+    path = url.split('?')[0]
+    if '/search/' in path:
+        return 'search'
+    if path.endswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+def install(session):
+    """
+    Routes every request of a requests session through the shared gate.
+    """
+    if getattr(session, 'rate_limited', False):
+        return session
+
+    send = session.send
+
+    def gated_send(request, **kwargs):
+        retries = config.get().rate_limit_retries
+        for attempt in range(retries + 1):
+            request_resource = resource(request.url)
+            gate.wait(request_resource)
+            response = send(request, **kwargs)
+            if not gate.update(response, request_resource) or attempt == retries:
+                return response
+            with gate.lock:
+                gate.retries += 1
+
+    session.send = gated_send
+    session.rate_limited = True
+    return session
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+GHOST_URL = 'https://github.com/ghost'
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    login: str
+    html_url: str
+
+
+@dataclass(frozen=True, slots=True)
+class ReviewRecord:
+    user: UserRecord
+    state: str
+
+
+@dataclass(frozen=True, slots=True)
+class PullRequestRecord:
+    """
+    Pull request data used by the reports, built once when it is fetched.
+    reviews is None when the reviews were not fetched.
+    """
+    repository: str
+    number: int
+    title: str
+    html_url: str
+    state: str
+    author: UserRecord
+    created_at: datetime
+    updated_at: datetime
+    labels: tuple = ()
+    reviews: tuple = None
+    requested_reviewers: tuple = ()
+
+
+def user_record(user):
+    # Deleted accounts come back as a missing user.
+    if user is None:
+        return UserRecord('ghost', GHOST_URL)
+    return UserRecord(user.login, user.html_url)
+
+
+def from_github3(pull, repository, reviews=None):
+    """
+    Builds a record from a github3 pull request of the named repository and, optionally, its github3 reviews.
+    """
+    return PullRequestRecord(
+        repository=repository,
+        number=pull.number,
+        title=pull.title,
+        html_url=pull.html_url,
+        state=pull.state,
+        author=user_record(pull.user),
+        created_at=pull.created_at,
+        updated_at=pull.updated_at,
+        labels=tuple(label['name'] for label in pull.labels),
+        reviews=None if reviews is None else tuple(ReviewRecord(user_record(review.user), review.state)
+                                                   for review in reviews),
+        requested_reviewers=tuple(user_record(reviewer) for reviewer in pull.requested_reviewers)
+    )
+
+
+def rest_datetime(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+
+def rest_user(node):
+    if node is None:
+        return UserRecord('ghost', GHOST_URL)
+    return UserRecord(node['login'], node['html_url'])
+
+
+def from_rest(node, reviews=None):
+    """
+    Builds a record from a REST API or webhook pull request and, optionally, its REST API reviews.
+    """
+    return PullRequestRecord(
+        repository=node['base']['repo']['name'],
+        number=node['number'],
+        title=node['title'],
+        html_url=node['html_url'],
+        state=node['state'],
+        author=rest_user(node['user']),
+        created_at=rest_datetime(node['created_at']),
+        updated_at=rest_datetime(node['updated_at']),
+        labels=tuple(label['name'] for label in node.get('labels', [])),
+        reviews=None if reviews is None else tuple(ReviewRecord(rest_user(review['user']), review['state'])
+                                                   for review in reviews),
+        requested_reviewers=tuple(rest_user(reviewer) for reviewer in node.get('requested_reviewers', []))
+    )
+
@@ -0,0 +1,156 @@
+import re
+import json
+import time
+import threading
+from collections import Counter
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+import controllers.config as config
+from controllers.instrumentation import endpoint
+
+SECRET = re.compile(r'(token=)[^&]*')
+
+# Adapter mounted by install() instead of the environment driven ones, set by the benchmarks.
+transport = None
+
+
+def redact(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    return SECRET.sub(r'\1REDACTED', body)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Transport adapter performing real requests and appending every exchange to a JSON lines file.
+    Tokens are left out of the recorded request bodies.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        exchange = {
+            'method': request.method,
+            'url': request.url,
+            'body': redact(request.body),
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'content': response.content.decode('utf-8', 'replace')
+        }
+        with self.lock:
+            with open(self.path, 'a') as record_file:
+                record_file.write(json.dumps(exchange) + '\n')
+        return response
+
+
+class StandInAdapter(BaseAdapter):
+    """
+    Transport adapter answering locally. Subclasses implement respond(request).
+    Every answer can be delayed by latency seconds and carry a decreasing rate limit budget. The first
+    pending_statistics requests of each contributor statistics URL are answered 202. They default to
+    REPLAY_LATENCY, REPLAY_RATE_LIMIT and REPLAY_STATS_PENDING.
+    """
+
+    def __init__(self, latency=None, rate_limit=None, pending_statistics=None):
+        super().__init__()
+        settings = config.get()
+        self.latency = settings.replay_latency if latency is None else latency
+        self.remaining = self.rate_limit = settings.replay_rate_limit if rate_limit is None else rate_limit
+        self.pending_statistics = (settings.replay_stats_pending if pending_statistics is None
+                                   else pending_statistics)
+        self.statistics_requests = Counter()
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def respond(self, request):
+        raise NotImplementedError
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.calls[endpoint(request.method, request.url)] += 1
+            if request.url.split('?')[0].endswith('/stats/contributors'):
+                self.statistics_requests[request.url] += 1
+                pending = self.statistics_requests[request.url] <= self.pending_statistics
+            else:
+                pending = False
+            if self.rate_limit:
+                self.remaining = max(self.remaining - 1, 0)
+
+        if pending:
+            status, headers, content = 202, {'Content-Type': 'application/json'}, '{}'
+        else:
+            status, headers, content = self.respond(request)
+
+        response = Response()
+        response.status_code = status
+        response.reason = 'OK' if status < 400 else 'Error'
+        response.headers = CaseInsensitiveDict(headers)
+        if self.rate_limit:
+            response.headers['X-RateLimit-Limit'] = str(self.rate_limit)
+            response.headers['X-RateLimit-Remaining'] = str(self.remaining)
+            response.headers['X-RateLimit-Reset'] = str(int(time.time()) + 3600)
+        response._content = content.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class ReplayAdapter(StandInAdapter):
+    """
+    Serves the exchanges of a file written by RecordingAdapter. Requests are matched on method and URL,
+    preferring the exchange with the same body. The last exchange of a URL is repeated when they run out.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.exchanges = {}
+        with open(path) as record_file:
+            for line in record_file:
+                exchange = json.loads(line)
+                self.exchanges.setdefault((exchange['method'], exchange['url']), []).append(exchange)
+
+    def respond(self, request):
+        with self.lock:
+            exchanges = self.exchanges.get((request.method, request.url))
+            if not exchanges:
+                return 404, {'Content-Type': 'application/json'}, json.dumps({'message': 'Not recorded'})
+
+            body = redact(request.body)
+            exchange = next((e for e in exchanges if e['body'] == body), exchanges[0])
+            if len(exchanges) > 1:
+                exchanges.remove(exchange)
+
+        return exchange['status'], exchange['headers'], exchange['content']
+
+
+def install(session):
+    """
+    Mounts the stand-in transport on a requests session: the module transport when set, otherwise a
+    recorder for HTTP_RECORD_FILE or a replayer for HTTP_REPLAY_FILE.
+    """
+    adapter = transport
+    settings = config.get()
+    if adapter is None and settings.http_replay_file:
+        adapter = ReplayAdapter(settings.http_replay_file)
+    elif adapter is None and settings.http_record_file:
+        adapter = RecordingAdapter(settings.http_record_file)
+
+    if adapter is not None:
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
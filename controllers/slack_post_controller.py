@@ -1,34 +1,177 @@
-import os
-import sys
 import json
-import requests
+import time
+import hashlib
+import queue
+import threading
+from concurrent.futures import Future
+import controllers.config as config
+import controllers.ttl_cache as ttl_cache
+import controllers.instrumentation as instrumentation
 
-POST_URL = 'https://slack.com/api/chat.postMessage'
-SLACK_CHANNEL = os.environ.get('SLACK_CHANNEL', 'developatheneabot')
+# Slack rejects section texts longer than 3000 characters and messages of more than 50 blocks.
+SECTION_LIMIT = 3000
+BLOCKS_LIMIT = 50
 
-try:
-    SLACK_API_TOKEN = os.environ['SLACK_API_TOKEN']
-except KeyError as error:
-    sys.stderr.write('Please set the environment variable {0}'.format(error))
-    sys.exit(1)
+session = None
 
+deliveries = None
+workers = []
+session_lock = threading.Lock()
+worker_lock = threading.Lock()
+state_lock = threading.Lock()
 
-def send_to_slack(blocks):
+# Answers of chat.update meaning the previous message is gone and a new one must be posted.
+UPDATE_LOST = ('message_not_found', 'cant_update_message', 'edit_window_closed', 'channel_not_found')
 
+
+def split_section(block):
+    """
+    Splits a section block whose text is over SECTION_LIMIT into several sections, between lines.
+    """
+    if block.get('type') != 'section' or len(block['text']['text']) <= SECTION_LIMIT:
+        return [block]
+
+    texts = []
+    current = None
+    for line in block['text']['text'].split('\n'):
+        line = line[:SECTION_LIMIT]
+        if current is not None and len(current) + 1 + len(line) > SECTION_LIMIT:
+            texts.append(current)
+            current = None
+        current = line if current is None else current + '\n' + line
+    texts.append(current)
+
+    return [{"type": "section", "text": {"type": block['text']['type'], "text": text}} for text in texts]
+
+
+def split_message(blocks):
+    """
+    Returns the block lists of the messages needed to post blocks within Slack's limits.
+    """
+    blocks = [section for block in blocks for section in split_section(block)]
+    return [blocks[i:i + BLOCKS_LIMIT] for i in range(0, len(blocks), BLOCKS_LIMIT)]
+
+
+def get_session():
+    """
+    Returns the HTTP session posting to Slack, created on the first message.
+    """
+    global session
+
+    with session_lock:
+        if session is None:
+            import requests
+            import controllers.replay as replay
+
+            session = instrumentation.install(replay.install(requests.Session()))
+    return session
+
+
+def post_message(blocks, channel=None, previous=None):
+    """
+    Posts one message to channel, SLACK_CHANNEL by default, waiting and retrying while Slack answers ratelimited.
+    previous, the channel id and ts of an earlier answer, is edited in place instead when given.
+    """
+    settings = config.get()
     payload = {
-        'token': SLACK_API_TOKEN,
-        'channel': SLACK_CHANNEL,
+        'token': settings.slack_api_token,
+        'channel': channel or settings.slack_channel,
         'blocks': json.dumps(blocks)
     }
+    if previous is not None:
+        payload.update(channel=previous['channel'], ts=previous['ts'])
+    url = settings.slack_api_url + ('/chat.postMessage' if previous is None else '/chat.update')
+
+    for attempt in range(settings.slack_retries + 1):
+        response = get_session().post(url, data=payload)
+        answer = response.json()
+        if answer['ok']:
+            return answer
+        if previous is not None and answer.get('error') in UPDATE_LOST:
+            return post_message(blocks, channel)
+        if answer.get('error') != 'ratelimited' or attempt == settings.slack_retries:
+            print(answer)
+            raise Exception(answer['error'])
+        time.sleep(int(response.headers.get('Retry-After', 2 ** attempt)))
+
+
+def deliver(jobs):
+    while True:
+        messages, channel, previous, future = jobs.get()
+        try:
+            # The messages of one send are posted in order by the same worker.
+            future.set_result([post_message(blocks, channel, previous[i] if previous else None)
+                               for i, blocks in enumerate(messages)])
+        except Exception as error:
+            future.set_exception(error)
+        finally:
+            jobs.task_done()
+
+
+@instrumentation.timed
+def send_to_slack(blocks, channel=None, previous=None):
+    """
+    Posts blocks to channel, split into as many messages as Slack's limits require, through the delivery
+    queue. SLACK_WORKERS sends are posted concurrently, so several channels are served at once.
+    previous holds one earlier answer per message to edit in place, it is ignored when the number of
+    messages changed. Returns Slack's answer for every message.
+    """
+    global deliveries
+
+    with worker_lock:
+        if deliveries is None:
+            deliveries = queue.Queue(maxsize=config.get().slack_queue_size)
+        while len(workers) < config.get().slack_workers:
+            worker = threading.Thread(target=deliver, args=(deliveries,), daemon=True)
+            worker.start()
+            workers.append(worker)
+
+    messages = split_message(blocks)
+    if previous is not None and len(previous) != len(messages):
+        previous = None
+
+    future = Future()
+    deliveries.put((messages, channel, previous, future))
+    return future.result()
+
+
+def update_in_slack(blocks, channel=None, content=None):
+    """
+    Edits the message last posted to channel through SLACK_STATE_FILE, posting it the first time.
+    Nothing is sent when content, the blocks by default, is the same as last time. Returns Slack's
+    answers, empty when skipped.
+    """
+    state_file = config.get().slack_state_file
+    channel = channel or config.get().slack_channel
+    content = blocks if content is None else content
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+    with state_lock:
+        previous = (ttl_cache.load(state_file, float('inf')) or {}).get(channel)
+    if previous is not None and previous['digest'] == digest:
+        return []
+
+    answers = send_to_slack(blocks, channel, previous['messages'] if previous else None)
+
+    with state_lock:
+        state = ttl_cache.load(state_file, float('inf')) or {}
+        state[channel] = {
+            'digest': digest,
+            'messages': [{'channel': answer['channel'], 'ts': answer['ts']} for answer in answers]
+        }
+        ttl_cache.save(state_file, state)
+    return answers
 
-    response = requests.post(POST_URL, data=payload)
-    answer = response.json()
-    if not answer['ok']:
-        print(answer)
-        raise Exception(answer['error'])
+
+def reminder_content(buckets):
+    """
+    Returns what a reminder shows of each pull request, without the age that changes on every run.
+    """
+    return {bucket: [[pr['repository'], pr['number'], pr['title'], pr['review_statuses']] for pr in pulls]
+            for bucket, pulls in buckets.items()}
 
 
-def post_pull_reminder(ready_to_merge=[], waiting_for_approvals=[], changes_needed=[], blocked=[]):
+def post_pull_reminder(ready_to_merge=[], waiting_for_approvals=[], changes_needed=[], blocked=[], channel=None):
     blocks = [
         {
             "type": "section",
@@ -125,11 +268,26 @@ def post_pull_reminder(ready_to_merge=[], waiting_for_approvals=[], changes_need
             }
         })
 
-    if len(blocked) > 0 or len(ready_to_merge) > 0 or len(waiting_for_approvals) > 0 or len(changes_needed) > 0:
-        send_to_slack(blocks)
+    has_pulls = len(blocked) > 0 or len(ready_to_merge) > 0 or len(waiting_for_approvals) > 0 or len(changes_needed) > 0
 
+    settings = config.get()
+    if settings.slack_state_file:
+        # The previous reminder is edited, down to the heading once every pull request is closed.
+        if has_pulls or (ttl_cache.load(settings.slack_state_file, float('inf')) or {}).get(
+                channel or settings.slack_channel):
+            content = reminder_content({'ready_to_merge': ready_to_merge, 'waiting_for_approvals': waiting_for_approvals,
+                                        'changes_needed': changes_needed, 'blocked': blocked})
+            update_in_slack(blocks, channel, content)
+    elif has_pulls:
+        send_to_slack(blocks, channel)
+
+
+def post_ranking_reviewers(windows=None, repositories=None, order='top', ranking_qty=0):
+    """
+    Posts one reviewer ranking per window, each window holding its days, users, cv_count and pr_count.
+    """
+    ranked = max([len(window['users']) for window in windows] or [0])
 
-def post_ranking_reviewers(users=None, repositories=None, order='top', ranking_qty=0, cv_count=0, pr_count=0):
     blocks = [
         {
             "type": "section",
@@ -149,46 +307,45 @@ def post_ranking_reviewers(users=None, repositories=None, order='top', ranking_q
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": "🚧 *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < len(users) else str(len(users))) + " - Ranking of Reviewers* 🚧"
+                "text": "🚧 *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < ranked else str(ranked)) + " - Ranking of Reviewers* 🚧"
             }
         }
     ]
 
-    if len(users) > 0:
-        blocks.append({
-            "type": "divider"
-        })
+    for window in windows:
+        users = window['users']
 
-        lines = ''
+        if len(users) > 0:
+            blocks.append({
+                "type": "divider"
+            })
 
-        for user_tuple in users:
-            lines += '\n' + '» ' + (':crown: ' if users.index(user_tuple) == 0 else '') + user_tuple[0] + ' (' + str(user_tuple[1]['reviews']) + ' reviews)'
+            lines = ''
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*GitHub User - (Reviews):*" + lines
-            }
-        })
+            for user_tuple in users:
+                lines += '\n' + '» ' + (':crown: ' if users.index(user_tuple) == 0 else '') + user_tuple[0] + ' (' + str(user_tuple[1]['reviews']) + ' reviews)'
 
-    if pr_count > 0 and cv_count > 0:
-        blocks.append({
-            "type": "divider"
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*GitHub User - (Reviews, last " + str(window['days']) + " days):*" + lines
+                }
+            })
 
-        lines = ''
+        if window['pr_count'] > 0 and window['cv_count'] > 0:
+            lines = ''
 
-        lines += '\n' + '» Total Pull Request Evaluated: ' + str(pr_count)
-        lines += '\n' + '» Total Reviews performed: ' + str(cv_count)
+            lines += '\n' + '» Total Pull Request Evaluated: ' + str(window['pr_count'])
+            lines += '\n' + '» Total Reviews performed: ' + str(window['cv_count'])
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Statistics:*" + lines
-            }
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Statistics:*" + lines
+                }
+            })
 
     """
     if len(repositories) > 0:
@@ -209,11 +366,17 @@ def post_ranking_reviewers(users=None, repositories=None, order='top', ranking_q
             }
         })
     """
-    if len(users) > 0:
+    if ranked > 0:
         send_to_slack(blocks)
 
 
-def post_ranking_contributions(contributions=None, order='top', ranking_qty=0, cm_count=0):
+def post_ranking_contributions(windows=None, order='top', ranking_qty=0):
+    """
+    Posts one commit ranking per window, each window holding its weeks, contributions, cm_count and the
+    cm_delta from the window before it.
+    """
+    ranked = max([len(window['contributions']) for window in windows] or [0])
+
     blocks = [
         {
             "type": "section",
@@ -233,52 +396,57 @@ def post_ranking_contributions(contributions=None, order='top', ranking_qty=0, c
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": ":female-technologist: *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < len(contributions) else str(len(contributions))) + " - Commits Count* :male-technologist:"
+                "text": ":female-technologist: *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < ranked else str(ranked)) + " - Commits Count* :male-technologist:"
             }
         }
     ]
 
-    if len(contributions) > 0:
-        blocks.append({
-            "type": "divider"
-        })
+    for window in windows:
+        contributions = window['contributions']
 
-        lines = ''
+        if len(contributions) > 0:
+            blocks.append({
+                "type": "divider"
+            })
 
-        for contrib in contributions:
-            lines += ('\n' + '» ' + (':crown: ' if contributions.index(contrib) == 0 else '') + contrib[0]
-                      + ' ( ' + str(contrib[1]['commits']) + ' commits: `+' + str(contrib[1]['additions']) + '`  `-' + str(contrib[1]['deletions']) + '` )')
+            lines = ''
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*GitHub User - (Contributions):*" + lines
-            }
-        })
+            for contrib in contributions:
+                lines += ('\n' + '» ' + (':crown: ' if contributions.index(contrib) == 0 else '') + contrib[0]
+                          + ' ( ' + str(contrib[1]['commits']) + ' commits, ' + '{0:+d}'.format(contrib[1]['commits_delta'])
+                          + ': `+' + str(contrib[1]['additions']) + '`  `-' + str(contrib[1]['deletions']) + '` )')
 
-    if cm_count > 0:
-        blocks.append({
-            "type": "divider"
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*GitHub User - (Contributions, last " + str(window['weeks']) + " weeks):*" + lines
+                }
+            })
 
-        lines = ''
+        if window['cm_count'] > 0:
+            lines = ''
 
-        lines += '\n' + '» Total Commits: ' + str(cm_count)
+            lines += '\n' + '» Total Commits: ' + str(window['cm_count']) + ' (' + '{0:+d}'.format(window['cm_delta']) + ' from the previous ' + str(window['weeks']) + ' weeks)'
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Statistics:*" + lines
-            }
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Statistics:*" + lines
+                }
+            })
 
-    if len(contributions) > 0:
+    if ranked > 0:
         send_to_slack(blocks)
 
 
-def post_ranking_pr_authors(users=None, order='top', ranking_qty=0, pr_count=0):
+def post_ranking_pr_authors(windows=None, order='top', ranking_qty=0):
+    """
+    Posts one pull request author ranking per window, each window holding its days, users and pr_count.
+    """
+    ranked = max([len(window['users']) for window in windows] or [0])
+
     blocks = [
         {
             "type": "section",
@@ -298,46 +466,45 @@ def post_ranking_pr_authors(users=None, order='top', ranking_qty=0, pr_count=0):
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": ":female-technologist: *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < len(users) else str(len(users))) + " - Pull Request Authors* :male-technologist:"
+                "text": ":female-technologist: *" + order.capitalize() + " " + (str(ranking_qty) if ranking_qty < ranked else str(ranked)) + " - Pull Request Authors* :male-technologist:"
             }
         }
     ]
 
-    if len(users) > 0:
-        blocks.append({
-            "type": "divider"
-        })
+    for window in windows:
+        users = window['users']
 
-        lines = ''
+        if len(users) > 0:
+            blocks.append({
+                "type": "divider"
+            })
 
-        for user in users:
-            lines += ('\n' + '» ' + (':crown: ' if users.index(user) == 0 else '') + user[0]
-                      + '    `' + str(user[1]['pr_count']) + ' pull requests`')
+            lines = ''
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*GitHub User - (Pull Requests):*" + lines
-            }
-        })
+            for user in users:
+                lines += ('\n' + '» ' + (':crown: ' if users.index(user) == 0 else '') + user[0]
+                          + '    `' + str(user[1]['pr_count']) + ' pull requests`')
 
-    if pr_count > 0:
-        blocks.append({
-            "type": "divider"
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*GitHub User - (Pull Requests, last " + str(window['days']) + " days):*" + lines
+                }
+            })
 
-        lines = ''
+        if window['pr_count'] > 0:
+            lines = ''
 
-        lines += '\n' + '» Total Pull Requests: ' + str(pr_count)
+            lines += '\n' + '» Total Pull Requests: ' + str(window['pr_count'])
 
-        blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": "*Statistics:*" + lines
-            }
-        })
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*Statistics:*" + lines
+                }
+            })
 
-    if len(users) > 0:
+    if ranked > 0:
         send_to_slack(blocks)
@@ -0,0 +1,41 @@
+import os
+import re
+import json
+
+
+def load(path):
+    """
+    Reads a routing file, a JSON list of {"channel", "repositories", "users"} entries.
+    repositories are regular expressions matching whole repository names, users are GitHub logins.
+    A route without repositories or users accepts any of them.
+    """
+    with open(os.path.expanduser(path)) as routes_file:
+        entries = json.load(routes_file)
+
+    routes = []
+    for entry in entries:
+        patterns = entry.get('repositories') or []
+        # Compiled as written, lower-casing a pattern would change escapes such as \W or \S.
+        repositories = re.compile('|'.join('(?:{0})'.format(p) for p in patterns), re.IGNORECASE) if patterns else None
+        routes.append({
+            'channel': entry['channel'],
+            'repositories': repositories,
+            'users': {user.lower() for user in entry.get('users') or []}
+        })
+    return routes
+
+
+def is_routed(route, repository, author):
+    return ((route['repositories'] is None or route['repositories'].fullmatch(repository.lower()) is not None)
+            and (not route['users'] or author.lower() in route['users']))
+
+
+def partition(routes, items):
+    """
+    Returns the items of every route channel, in their original order. An item goes to the channel of every route it matches.
+    """
+    channels = {route['channel']: [] for route in routes}
+    for item in items:
+        for channel in {route['channel'] for route in routes if is_routed(route, item['repository'], item['author'])}:
+            channels[channel].append(item)
+    return channels
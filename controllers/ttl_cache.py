@@ -0,0 +1,30 @@
+import os
+import json
+import time
+
+
+def load(path, ttl):
+    """
+    Returns the data saved at path when it is younger than ttl seconds, None otherwise.
+    """
+    try:
+        with open(os.path.expanduser(path)) as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry['saved_at'] > ttl:
+        return None
+    return entry['data']
+
+
+def save(path, data):
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Written next to the target then renamed, so concurrent runs never read half a file.
+    with open(path + '.tmp', 'w') as cache_file:
+        json.dump({'saved_at': time.time(), 'data': data}, cache_file)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,60 @@
+import hmac
+import json
+import hashlib
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import controllers.config as config
+
+
+def is_signed(body, signature):
+    """
+    Checks the X-Hub-Signature-256 header of a payload against WEBHOOK_SECRET. Always True when it is unset.
+    """
+    secret = config.get().webhook_secret
+    if not secret:
+        return True
+    expected = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or '')
+
+
+def handler_for(view):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not is_signed(body, self.headers.get('X-Hub-Signature-256')):
+                return self.answer(401, 'Invalid signature')
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return self.answer(400, 'Invalid JSON')
+
+            try:
+                applied = view.apply(self.headers.get('X-GitHub-Event', ''), payload)
+            except (KeyError, TypeError, AttributeError):
+                return self.answer(400, 'Unexpected payload')
+            except Exception:
+                # Fetching the pull request failed, GitHub shows the error and the next resync catches up.
+                traceback.print_exc()
+                return self.answer(500, 'Failed to apply')
+            self.answer(200, 'Applied' if applied else 'Ignored')
+
+        def answer(self, status, text):
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain')
+            self.end_headers()
+            self.wfile.write(text.encode('utf-8'))
+
+    return WebhookHandler
+
+
+def serve(view, host=None, port=None):
+    """
+    Applies the GitHub webhook payloads POSTed on host:port to view, from a background thread.
+    host and port default to WEBHOOK_HOST and WEBHOOK_PORT.
+    """
+    settings = config.get()
+    server = ThreadingHTTPServer((settings.webhook_host if host is None else host,
+                                  settings.webhook_port if port is None else port), handler_for(view))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,5 @@
+import controllers.config as config
+from functions import daemon
+
+config.validate()
+daemon.run()
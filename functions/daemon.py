@@ -0,0 +1,62 @@
+import sys
+import time
+import sched
+import traceback
+import controllers.config as config
+import controllers.github_controller as github
+import controllers.webhook_server as webhook_server
+from controllers.pull_request_view import OpenPullRequestView
+from functions import slack_statistic_messaging
+
+
+def every(scheduler, seconds, function, delay=0):
+    """
+    Runs function after delay seconds and then every seconds, logging its failures instead of stopping the daemon.
+    """
+    def job():
+        scheduler.enter(seconds, 0, job)
+        try:
+            function()
+        except Exception:
+            traceback.print_exc()
+
+    scheduler.enter(delay, 0, job)
+
+
+def run():
+    settings = config.get()
+    intervals = dict(settings.daemon_schedule)
+    unknown = [name for name in intervals if name not in slack_statistic_messaging.REPORTS]
+    if unknown:
+        sys.stderr.write('Unknown reports {0}, choose among {1}'.format(
+            ', '.join(unknown), ', '.join(slack_statistic_messaging.REPORTS)))
+        sys.exit(1)
+
+    view = OpenPullRequestView()
+    scheduler = sched.scheduler(time.monotonic, time.sleep)
+
+    reports = {name: fresh(report) for name, report in slack_statistic_messaging.REPORTS.items()}
+
+    if settings.webhook_port:
+        # Webhooks keep the view current, it is only fetched again every DAEMON_RESYNC seconds.
+        view.resync()
+        webhook_server.serve(view)
+        every(scheduler, settings.daemon_resync, view.resync, delay=settings.daemon_resync)
+        reports['reminder'] = lambda: slack_statistic_messaging.pull_request_reminder(view.records())
+
+    for name, seconds in intervals.items():
+        every(scheduler, seconds, reports[name])
+
+    scheduler.run()
+
+
+def fresh(report):
+    """
+    Wraps a report so that it fetches again instead of reusing the data of its previous run. The fetches
+    still go through the HTTP cache and the pull request store when they are enabled.
+    """
+    def run_report():
+        github.run_cache.clear()
+        report()
+
+    return run_report
@@ -1,16 +1,26 @@
-import os
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+import controllers.config as config
 import controllers.slack_post_controller as slack
+import controllers.slack_routes as slack_routes
 import controllers.github_controller as github
+import controllers.instrumentation as instrumentation
 
-MIN_OF_REVIEW = int(os.environ.get('MIN_OF_REVIEW', 0))
-ORDER_CRITERIA = os.environ.get('ORDER_CRITERIA', "Top")
-RANKING_QTY = int(os.environ.get('RANKING_QTY', 5))
 
+def rank(users, field):
+    """
+    Returns the RANKING_QTY first (login, values) items by field in ORDER_CRITERIA order, without sorting
+    every user.
+    """
+    settings = config.get()
+    select = heapq.nlargest if settings.order_criteria.lower() == 'top' else heapq.nsmallest
+    return select(settings.ranking_qty, users.items(), key=lambda user: user[1][field])
 
-def pull_request_reminder():
-    repositories = github.fetch_organization_repositories()
-    pull_requests = github.fetch_open_pulls_requests_formatted(repositories)
 
+def classify_pull_requests(pull_requests):
+    """
+    Returns the ready to merge, waiting for approvals, changes needed and blocked pull requests.
+    """
     blockeds = []
     ready_to_merge = []
     waiting_for_approvals = []
@@ -22,67 +32,121 @@ def pull_request_reminder():
         else:
             if pr['reviews']['CHANGES_REQUESTED'] > 0 or pr['reviews']['COMMENTED'] > 0:
                 changes_needed.append(pr)
-            elif pr['reviews']['APPROVED'] >= MIN_OF_REVIEW:
+            elif pr['reviews']['APPROVED'] >= config.get().min_of_review:
                 ready_to_merge.append(pr)
             else:
                 waiting_for_approvals.append(pr)
 
-    slack.post_pull_reminder(ready_to_merge, waiting_for_approvals, changes_needed, blockeds)
+    return ready_to_merge, waiting_for_approvals, changes_needed, blockeds
+
+
+def pull_request_reminder(records=None):
+    """
+    Posts the open pull requests, fetched unless their records are given, by the daemon for example.
+    """
+    routes = slack_routes.load(config.get().slack_routes) if config.get().slack_routes else None
+
+    if records is None:
+        # Pull requests are classified as they are fetched.
+        pull_requests = github.fetch_open_pulls_requests_formatted(
+            github.fetch_organization_repositories(with_open_pulls=True))
+    else:
+        pull_requests = github.format_pull_requests(records, config.get().organization)
+
+    if routes is None:
+        slack.post_pull_reminder(*classify_pull_requests(pull_requests))
+        return
+
+    # One fetch serves every route, each channel gets its share and the channels are posted concurrently.
+    channels = slack_routes.partition(routes, pull_requests)
+    with ThreadPoolExecutor(max_workers=max(len(channels), 1)) as executor:
+        posts = [executor.submit(slack.post_pull_reminder, *classify_pull_requests(channel_pulls), channel=channel)
+                 for channel, channel_pulls in channels.items()]
+    for post in posts:
+        post.result()
 
 
 def top_bottom_reviewers():
+    """
+    Posts the reviewer ranking of every TIME_WINDOWS window, in days, in one message.
+    """
+    settings = config.get()
     repositories_list = github.fetch_organization_repositories()
-    pull_requests = github.fetch_organization_raw_pulls(repositories_list)
-    all_users = github.fetch_users_without_reviews(repositories_list)
-    users_with_reviews = github.fetch_user_reviews_count(pull_requests)
-
-    all_users.update(users_with_reviews)
-    cv_count = 0
+    users_without_reviews = github.fetch_users_without_reviews(repositories_list)
+    windows = []
 
-    for item in all_users.items():
-        cv_count += item[1]['reviews']
+    for days, (users_with_reviews, pr_count) in github.fetch_reviews_count(
+            repositories_list, users_without_reviews, settings.time_windows).items():
+        all_users = dict(users_without_reviews)
+        all_users.update(users_with_reviews)
 
-    all_users = sorted(all_users.items(),
-                       key=lambda user: user[1]['reviews'],
-                       reverse=ORDER_CRITERIA.lower() == 'top')[:RANKING_QTY]
+        windows.append({
+            'days': days,
+            'users': rank(all_users, 'reviews'),
+            'cv_count': sum(user['reviews'] for user in all_users.values()),
+            'pr_count': pr_count
+        })
 
-    slack.post_ranking_reviewers(users=all_users, repositories=repositories_list, order=ORDER_CRITERIA,
-                                 ranking_qty=RANKING_QTY, cv_count=cv_count, pr_count=len(pull_requests))
+    slack.post_ranking_reviewers(windows=windows, repositories=repositories_list, order=settings.order_criteria,
+                                 ranking_qty=settings.ranking_qty)
 
 
 def top_bottom_contributions():
+    """
+    Posts the commit ranking of every CONTRIBUTION_WINDOWS window, in weeks, with the change from the
+    window before it, in one message. The weekly statistics are fetched once for all windows.
+    """
+    settings = config.get()
     repositories_list = github.fetch_organization_repositories()
-    contributor_statistics = github.fetch_contributor_statistics(repositories_list)
+    store = github.fetch_contributor_store(repositories_list)
+    windows = []
 
-    cm_count = 0
+    for weeks in settings.contribution_windows:
+        contributor_statistics = github.fetch_contributor_statistics(repositories_list, weeks, store=store)
+        previous = github.fetch_contributor_statistics(repositories_list, weeks, offset=weeks, store=store)
 
-    for item in contributor_statistics.items():
-        cm_count += item[1]['commits']
+        for login, statistics in contributor_statistics.items():
+            statistics['commits_delta'] = statistics['commits'] - previous.get(login, {}).get('commits', 0)
 
-    contributor_statistics = sorted(contributor_statistics.items(),
-                                    key=lambda user: user[1]['commits'],
-                                    reverse=ORDER_CRITERIA.lower() == 'top')[:RANKING_QTY]
+        cm_count = sum(statistics['commits'] for statistics in contributor_statistics.values())
+        windows.append({
+            'weeks': weeks,
+            'contributions': rank(contributor_statistics, 'commits'),
+            'cm_count': cm_count,
+            'cm_delta': cm_count - sum(statistics['commits'] for statistics in previous.values())
+        })
 
-    slack.post_ranking_contributions(contributions=contributor_statistics, order=ORDER_CRITERIA,
-                                     ranking_qty=RANKING_QTY, cm_count=cm_count)
+    slack.post_ranking_contributions(windows=windows, order=settings.order_criteria, ranking_qty=settings.ranking_qty)
 
 
 def top_bottom_pr_authors():
+    """
+    Posts the pull request author ranking of every TIME_WINDOWS window, in days, in one message.
+    The pull requests of the widest window are fetched once.
+    """
+    settings = config.get()
     repositories_list = github.fetch_organization_repositories()
-    pull_requests = github.fetch_organization_raw_pulls(repositories_list)
-    users = github.fetch_users_pr_author(pull_requests)
+    pull_requests = github.fetch_organization_raw_pulls(repositories_list, with_reviews=False,
+                                                        days=max(settings.time_windows))
+    instrumentation.note('pull_requests_evaluated', len(pull_requests))
 
-    pr_count = len(pull_requests)
+    windows = [{
+        'days': days,
+        'users': rank(users, 'pr_count'),
+        'pr_count': sum(user['pr_count'] for user in users.values())
+    } for days, users in github.fetch_window_pr_authors(pull_requests, settings.time_windows).items()]
 
-    print(pr_count)
+    slack.post_ranking_pr_authors(windows=windows, order=settings.order_criteria, ranking_qty=settings.ranking_qty)
 
-    users = sorted(users.items(),
-                   key=lambda user: user[1]['pr_count'],
-                   reverse=ORDER_CRITERIA.lower() == 'top')[:RANKING_QTY]
 
-    slack.post_ranking_pr_authors(users=users, order=ORDER_CRITERIA,
-                                  ranking_qty=RANKING_QTY, pr_count=pr_count)
+REPORTS = {
+    'reminder': pull_request_reminder,
+    'committers': top_bottom_contributions,
+    'pr_authors': top_bottom_pr_authors,
+    'reviewers': top_bottom_reviewers
+}
 
 
 if __name__ == '__main__':
+    config.validate()
     pull_request_reminder()
@@ -0,0 +1,18 @@
+import os
+import sys
+import controllers.config as config
+from functions import slack_statistic_messaging
+
+REPORTS = slack_statistic_messaging.REPORTS
+
+names = sys.argv[1:] or [r.strip() for r in os.environ.get('REPORTS', ','.join(REPORTS)).split(',') if r.strip()]
+
+unknown = [name for name in names if name not in REPORTS]
+if unknown:
+    sys.stderr.write('Unknown reports {0}, choose among {1}'.format(', '.join(unknown), ', '.join(REPORTS)))
+    sys.exit(1)
+
+config.validate()
+
+for name in names:
+    REPORTS[name]()
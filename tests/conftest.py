@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+import pytest
+import controllers.config as config
+import controllers.replay as replay
+import controllers.rate_limit as rate_limit
+import controllers.github_controller as github
+import controllers.github_graphql_controller as graphql
+import controllers.slack_post_controller as slack
+from benchmarks.synthetic import SyntheticGitHub
+
+ENVIRON = {'GITHUB_API_TOKEN': 'test', 'SLACK_API_TOKEN': 'test', 'ORGANIZATION': 'test', 'REPOSITORY_REGEX': '.*'}
+
+# Every stand-in of a session generates the same pull requests, so that a later run finds them unchanged.
+NOW = datetime.now(tz=timezone.utc)
+
+
+@pytest.fixture
+def stand_in():
+    """
+    Returns a function answering GitHub and Slack with a SyntheticGitHub of repositories x pulls, for the settings
+    of ENVIRON overridden by its keyword arguments. Returns the adapter, whose calls count the requests per endpoint.
+    """
+    def start(repositories=2, pulls=50, **environ):
+        config.current = config.load(dict(ENVIRON, **environ))
+        adapter = SyntheticGitHub(config.current.organization, repositories, pulls)
+        adapter.now = NOW
+        replay.transport = adapter
+        rate_limit.gate = rate_limit.RateLimitGate()
+        github.client = None
+        github.run_cache.clear()
+        replay.install(slack.get_session())
+        replay.install(graphql.get_session())
+        return adapter
+
+    yield start
+
+    config.current = None
+    replay.transport = None
+    github.client = None
+    github.run_cache.clear()
@@ -0,0 +1,84 @@
+import pytest
+import requests
+import controllers.replay as replay
+import controllers.github_controller as github
+import controllers.github_graphql_controller as graphql
+
+
+def open_pulls(stand_in, **environ):
+    """
+    Returns the open pull requests of the reminder as tuples, and the calls made.
+    """
+    adapter = stand_in(**environ)
+    repositories = github.fetch_organization_repositories(with_open_pulls=True)
+    pulls = [(pull.repository, pull.number, pull.title, pull.author, pull.labels, pull.reviews,
+              pull.requested_reviewers) for pull in github.fetch_open_pull_records(repositories)]
+    return pulls, adapter.calls
+
+
+def test_graphql_pull_requests_match_rest(stand_in):
+    rest, _ = open_pulls(stand_in, repositories=30, pulls=15000)
+    pulls, calls = open_pulls(stand_in, repositories=30, pulls=15000, GITHUB_BACKEND='graphql')
+
+    assert pulls == rest
+    # Two pages of repositories, the 100 open pull requests of every repository in two pages of 50.
+    assert calls['POST /graphql'] == 2 + 30
+
+
+def test_connections_past_the_first_page_are_fetched(stand_in, monkeypatch):
+    rest, _ = open_pulls(stand_in)
+    monkeypatch.setattr(graphql, 'ORGANIZATION_QUERY', graphql.ORGANIZATION_QUERY.replace('reviews(first: 100)',
+                                                                                          'reviews(first: 1)'))
+    pulls, calls = open_pulls(stand_in, GITHUB_BACKEND='graphql')
+
+    assert pulls == rest
+    assert calls['POST /graphql'] == 1 + len(pulls)
+
+
+def test_unselected_repositories_are_not_paginated(stand_in):
+    pulls, calls = open_pulls(stand_in, repositories=3, pulls=1500, GITHUB_BACKEND='graphql',
+                              REPOSITORY_REGEX='repository-0001')
+
+    assert {pull[0] for pull in pulls} == {'repository-0001'}
+    assert len(pulls) == 100
+    assert calls['POST /graphql'] == 2
+
+
+def test_named_repositories_are_queried_directly(stand_in, capsys):
+    pulls, calls = open_pulls(stand_in, repositories=3, GITHUB_BACKEND='graphql', REPOSITORY_REGEX='',
+                              REPOSITORIES='repository-0002,missing')
+
+    assert {pull[0] for pull in pulls} == {'repository-0002'}
+    assert calls['POST /graphql'] == 2
+    assert 'Repositories not found in test: missing' in capsys.readouterr().err
+
+
+def test_http_errors_are_raised(stand_in, monkeypatch):
+    adapter = stand_in(GITHUB_BACKEND='graphql')
+    monkeypatch.setattr(adapter, 'respond', lambda request: adapter.answer({'message': 'Bad credentials'}, 401))
+
+    with pytest.raises(requests.HTTPError):
+        github.fetch_organization_repositories(with_open_pulls=True)
+
+
+def test_recorded_queries_are_replayed(stand_in, monkeypatch, tmp_path):
+    path = str(tmp_path / 'exchanges.jsonl')
+    rest, _ = open_pulls(stand_in)
+
+    # The recorder performs its requests against the stand-in instead of the network.
+    adapter = stand_in(GITHUB_BACKEND='graphql', HTTP_RECORD_FILE=path)
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', lambda self, request, **kwargs: adapter.send(request))
+    monkeypatch.setattr(replay, 'transport', None)
+    monkeypatch.setattr(graphql, 'session', None)
+    github.fetch_open_pull_records(github.fetch_organization_repositories(with_open_pulls=True))
+    monkeypatch.undo()
+
+    stand_in(GITHUB_BACKEND='graphql')
+    replay.transport = replay.ReplayAdapter(path)
+    graphql.session = None
+    pulls = [(pull.repository, pull.number, pull.title, pull.author, pull.labels, pull.reviews,
+              pull.requested_reviewers)
+             for pull in github.fetch_open_pull_records(github.fetch_organization_repositories(with_open_pulls=True))]
+
+    assert pulls == rest
+    assert sum(replay.transport.calls.values()) == 1
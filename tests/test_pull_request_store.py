@@ -0,0 +1,49 @@
+import controllers.github_controller as github
+
+REVIEWS = 'GET /repos/:owner/:repo/pulls/:number/reviews'
+
+
+def fetch_pulls(stand_in, days, **environ):
+    """
+    Returns the repository, number and reviewers of the pull requests of the last days days, and the calls made.
+    """
+    adapter = stand_in(repositories=3, pulls=300, **environ)
+    pulls = github.fetch_organization_raw_pulls(github.fetch_organization_repositories(), days=days)
+    return sorted((pull.repository, pull.number, tuple(sorted(review.user.login for review in pull.reviews)))
+                  for pull in pulls), adapter.calls
+
+
+def test_store_answers_like_a_fetch(stand_in, tmp_path):
+    store = str(tmp_path / 'pulls.db')
+    fetched, fetch_calls = fetch_pulls(stand_in, 30)
+
+    stored, _ = fetch_pulls(stand_in, 30, PR_STORE_PATH=store)
+    assert stored == fetched
+
+    stored, store_calls = fetch_pulls(stand_in, 30, PR_STORE_PATH=store)
+    assert stored == fetched
+    assert REVIEWS in fetch_calls and REVIEWS not in store_calls
+
+
+def test_wider_window_is_backfilled_once(stand_in, tmp_path):
+    store = str(tmp_path / 'pulls.db')
+    fetched, _ = fetch_pulls(stand_in, 60)
+
+    fetch_pulls(stand_in, 7, PR_STORE_PATH=store)
+    stored, backfill_calls = fetch_pulls(stand_in, 60, PR_STORE_PATH=store)
+    assert stored == fetched
+    assert backfill_calls[REVIEWS] == len(fetched) - len(fetch_pulls(stand_in, 7)[0])
+
+    stored, store_calls = fetch_pulls(stand_in, 60, PR_STORE_PATH=store)
+    assert stored == fetched
+    assert REVIEWS not in store_calls
+
+
+def test_narrower_window_is_read_from_the_store(stand_in, tmp_path):
+    store = str(tmp_path / 'pulls.db')
+    fetched, _ = fetch_pulls(stand_in, 7)
+
+    fetch_pulls(stand_in, 60, PR_STORE_PATH=store)
+    stored, store_calls = fetch_pulls(stand_in, 7, PR_STORE_PATH=store)
+    assert stored == fetched
+    assert REVIEWS not in store_calls
@@ -0,0 +1,153 @@
+import hmac
+import json
+import hashlib
+import urllib.error
+import urllib.request
+import pytest
+import controllers.github_controller as github
+import controllers.webhook_server as webhook_server
+from controllers.pull_request_view import OpenPullRequestView
+
+REVIEWS = 'GET /repos/:owner/:repo/pulls/:number/reviews'
+PULL = 'GET /repos/:owner/:repo/pulls/:number'
+
+
+def payload(adapter, action, name, number, **fields):
+    return dict({'action': action, 'organization': {'login': adapter.organization},
+                 'pull_request': adapter.pull_json(name, number)}, **fields)
+
+
+def review(login, state):
+    return {'user': {'login': login, 'html_url': 'https://github.com/' + login}, 'state': state}
+
+
+@pytest.fixture
+def adapter(stand_in):
+    return stand_in()
+
+
+@pytest.fixture
+def view(adapter):
+    view = OpenPullRequestView()
+    view.resync()
+    adapter.calls.clear()
+    return view
+
+
+def test_resync_holds_the_open_pull_requests(view):
+    assert [(pull.repository, pull.number) for pull in view.records()] == [
+        ('repository-0000', number) for number in (25, 20, 15, 10, 5)] + [
+        ('repository-0001', number) for number in (25, 20, 15, 10, 5)]
+
+
+def test_review_of_a_known_pull_request_is_applied_without_fetching(view, adapter):
+    assert view.apply('pull_request_review', payload(adapter, 'submitted', 'repository-0000', 5,
+                                                     review=review('user-042', 'approved')))
+
+    pull = view.pulls[('repository-0000', 5)]
+    assert pull.reviews[-1].user.login == 'user-042' and pull.reviews[-1].state == 'APPROVED'
+    assert not adapter.calls
+
+
+def test_dismissed_review_is_dismissed(view, adapter):
+    view.apply('pull_request_review', payload(adapter, 'submitted', 'repository-0000', 5,
+                                              review=review('user-042', 'approved')))
+    view.apply('pull_request_review', payload(adapter, 'dismissed', 'repository-0000', 5,
+                                              review=review('user-042', 'dismissed')))
+
+    assert [r.state for r in view.pulls[('repository-0000', 5)].reviews if r.user.login == 'user-042'] == ['DISMISSED']
+
+
+def test_closed_pull_request_is_removed(view, adapter):
+    assert view.apply('pull_request', payload(adapter, 'closed', 'repository-0001', 10))
+
+    assert ('repository-0001', 10) not in view.pulls
+    assert len(view.records()) == 9
+
+
+def test_unknown_pull_request_is_fetched_with_its_reviews(view, adapter):
+    view.pulls.pop(('repository-0000', 5))
+
+    assert view.apply('pull_request', payload(adapter, 'edited', 'repository-0000', 5))
+
+    assert len(view.pulls[('repository-0000', 5)].reviews) == 2
+    assert adapter.calls[PULL] == 1 and adapter.calls[REVIEWS] == 1
+
+
+def test_ignored_events_fetch_nothing(stand_in):
+    adapter = stand_in(repositories=3, REPOSITORIES='repository-0000', REPOSITORY_REGEX='')
+    view = OpenPullRequestView()
+    other = dict(payload(adapter, 'edited', 'repository-0000', 5), organization={'login': 'other'})
+
+    assert not view.apply('issues', payload(adapter, 'opened', 'repository-0000', 5))
+    assert not view.apply('pull_request', other)
+    assert not view.apply('pull_request', dict(other, organization=None))
+    assert not view.apply('pull_request', payload(adapter, 'edited', 'repository-0002', 5))
+    assert not adapter.calls
+
+
+def test_opened_pull_request_with_an_ignored_title_is_not_added(stand_in):
+    view = OpenPullRequestView()
+    adapter = stand_in(IGNORE_WORDS='number 30')
+    view.resync()
+
+    view.apply('pull_request', payload(adapter, 'opened', 'repository-0000', 30))
+
+    assert ('repository-0000', 30) not in view.pulls
+
+
+def test_updates_made_during_a_resync_are_kept(view, adapter, monkeypatch):
+    fetch_open_pull_records = github.fetch_open_pull_records
+
+    def fetch_during_a_close(repositories):
+        view.apply('pull_request', payload(adapter, 'closed', 'repository-0000', 5))
+        return fetch_open_pull_records(repositories)
+
+    monkeypatch.setattr(github, 'fetch_open_pull_records', fetch_during_a_close)
+    view.resync()
+
+    assert ('repository-0000', 5) not in view.pulls
+    assert view.changes is None
+
+
+def post(server, event, body, secret=None):
+    data = json.dumps(body).encode('utf-8')
+    headers = {'X-GitHub-Event': event}
+    if secret:
+        headers['X-Hub-Signature-256'] = 'sha256=' + hmac.new(secret.encode('utf-8'), data, hashlib.sha256).hexdigest()
+    request = urllib.request.Request('http://127.0.0.1:{0}/'.format(server.server_address[1]), data, headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as error:
+        return error.code, error.read().decode('utf-8')
+
+
+@pytest.fixture
+def server(view):
+    server = webhook_server.serve(view, port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook_server_answers_every_payload(adapter, server):
+    assert post(server, 'pull_request', payload(adapter, 'closed', 'repository-0000', 5)) == (200, 'Applied')
+    assert post(server, 'pull_request', {'organization': None, 'pull_request': {}}) == (200, 'Ignored')
+    assert post(server, 'pull_request', {'organization': {'login': 'test'}})[0] == 400
+    # The pull request does not exist, fetching it fails.
+    missing = payload(adapter, 'edited', 'repository-0000', 5)
+    missing['pull_request']['number'] = 999
+    assert post(server, 'pull_request', missing) == (500, 'Failed to apply')
+
+
+def test_webhook_server_checks_the_signature(stand_in):
+    stand_in(WEBHOOK_SECRET='secret')
+    view = OpenPullRequestView()
+    server = webhook_server.serve(view, port=0)
+    try:
+        assert post(server, 'ping', {}, secret='wrong') == (401, 'Invalid signature')
+        assert post(server, 'ping', {}, secret='secret') == (200, 'Ignored')
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,33 @@
+import controllers.github_controller as github
+
+LOGINS = ['user-{0:03d}'.format(index) for index in range(50)]
+
+
+def count_reviews(stand_in, strategy):
+    """
+    Returns the reviews per login and the pull request count of each window, leaving out the logins without
+    reviews that only a search lists, and the calls made.
+    """
+    adapter = stand_in(repositories=3, pulls=300, REVIEW_COUNT_STRATEGY=strategy, TIME_WINDOWS='7,30,90')
+    counts = github.fetch_reviews_count(github.fetch_organization_repositories(), LOGINS, (7, 30, 90))
+    return {days: ({login: user['reviews'] for login, user in users.items() if user['reviews']}, pr_count)
+            for days, (users, pr_count) in counts.items()}, adapter.calls
+
+
+def test_walk_and_search_count_the_same_reviews(stand_in):
+    walked, walk_calls = count_reviews(stand_in, 'walk')
+    searched, search_calls = count_reviews(stand_in, 'search')
+
+    assert 'GET /search/issues' not in walk_calls
+    assert 'GET /repos/:owner/:repo/pulls/:number/reviews' not in search_calls
+    assert searched == walked
+    assert [pr_count for _, pr_count in walked.values()] == sorted(pr_count for _, pr_count in walked.values())
+
+
+def test_reviews_of_ignored_users_are_not_counted(stand_in):
+    stand_in(REVIEW_COUNT_STRATEGY='walk', IGNORE_USERS='user-002')
+    counts = github.fetch_reviews_count(github.fetch_organization_repositories(), LOGINS, (30,))
+
+    reviews, _ = counts[30]
+    assert 'user-002' not in reviews
+    assert reviews
@@ -0,0 +1,48 @@
+import controllers.slack_post_controller as slack
+from functions import slack_statistic_messaging
+
+
+def section(text):
+    return {'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}}
+
+
+def test_split_message_keeps_sections_and_messages_within_limits():
+    lines = ['line {0} '.format(index) + 'x' * 90 for index in range(100)]
+    messages = slack.split_message([section('\n'.join(lines))] + [section('short')] * 60)
+
+    blocks = [block for message in messages for block in message]
+    assert all(len(message) <= slack.BLOCKS_LIMIT for message in messages)
+    assert all(len(block['text']['text']) <= slack.SECTION_LIMIT for block in blocks)
+    assert '\n'.join(block['text']['text'] for block in blocks[:-60]) == '\n'.join(lines)
+    assert len(messages) == 2
+
+
+def test_split_message_cuts_lines_over_the_section_limit():
+    blocks = slack.split_message([section('y' * (slack.SECTION_LIMIT + 10))])[0]
+
+    assert [len(block['text']['text']) for block in blocks] == [slack.SECTION_LIMIT]
+
+
+def test_reminder_content_ignores_the_ages():
+    pull = {'repository': 'api', 'number': 1, 'title': 'Fix', 'review_statuses': '', 'text': 'opened 1 Day ago'}
+
+    assert (slack.reminder_content({'ready': [pull]})
+            == slack.reminder_content({'ready': [dict(pull, text='opened 2 Days ago')]}))
+
+
+def test_reminder_is_edited_in_place_and_skipped_when_unchanged(stand_in, tmp_path):
+    state_file = str(tmp_path / 'state.json')
+
+    adapter = stand_in(SLACK_STATE_FILE=state_file)
+    slack_statistic_messaging.pull_request_reminder()
+    assert adapter.calls['POST /api/chat.postMessage'] == 1
+
+    adapter = stand_in(SLACK_STATE_FILE=state_file)
+    slack_statistic_messaging.pull_request_reminder()
+    assert 'POST /api/chat.postMessage' not in adapter.calls
+    assert 'POST /api/chat.update' not in adapter.calls
+
+    adapter = stand_in(repositories=3, SLACK_STATE_FILE=state_file)
+    slack_statistic_messaging.pull_request_reminder()
+    assert adapter.calls['POST /api/chat.update'] == 1
+    assert 'POST /api/chat.postMessage' not in adapter.calls
@@ -1,3 +1,5 @@
+import controllers.config as config
 from functions import slack_statistic_messaging
 
+config.validate()
 slack_statistic_messaging.top_bottom_contributions()